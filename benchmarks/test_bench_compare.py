@@ -0,0 +1,63 @@
+import io
+import itertools
+
+import pytest
+pytest.importorskip('pytest_benchmark')
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot as plt
+import numpy as np
+
+from playfair.compare import add_comparisons_to_axes, Comparison, stars
+from playfair.layout import comparison_layout
+
+def _random_comparisons(nr_of_comparisons, nr_of_groups=20, seed=0):
+    rng = np.random.default_rng(seed)
+    groups = [rng.normal(loc=i % 5, size=30) for i in range(nr_of_groups)]
+    comparisons = []
+    for i in range(nr_of_comparisons):
+        (pos1, pos2) = sorted(rng.choice(nr_of_groups, size=2, replace=False) + 1)
+        comparisons.append(Comparison(stars(1 + i % 3), groups[pos1 - 1], groups[pos2 - 1],
+                                      int(pos1), int(pos2)))
+    return (groups, comparisons)
+
+def _new_axes(groups):
+    fig, ax = plt.subplots(1)
+    ax.boxplot(groups)
+    return (fig, ax)
+
+@pytest.mark.parametrize('batched', [False, True])
+@pytest.mark.parametrize('nr_of_comparisons', [10, 100, 1000])
+def test_add_comparisons_to_axes(benchmark, nr_of_comparisons, batched):
+    (groups, comparisons) = _random_comparisons(nr_of_comparisons)
+    figures = []
+
+    def setup():
+        (fig, ax) = _new_axes(groups)
+        figures.append(fig)
+        return ((ax, comparisons), dict(batched=batched))
+
+    rounds = 20 if nr_of_comparisons < 1000 else 3
+    benchmark.pedantic(add_comparisons_to_axes, setup=setup, rounds=rounds)
+    for fig in figures:
+        plt.close(fig)
+
+@pytest.mark.parametrize('format', ['png', 'svg', 'pdf'])
+@pytest.mark.parametrize('batched', [False, True])
+def test_savefig(benchmark, format, batched):
+    (groups, comparisons) = _random_comparisons(100)
+    (fig, ax) = _new_axes(groups)
+    add_comparisons_to_axes(ax, comparisons, batched=batched)
+
+    def savefig():
+        fig.savefig(io.BytesIO(), format=format)
+
+    benchmark.pedantic(savefig, rounds=5, warmup_rounds=1)
+    plt.close(fig)
+
+def test_comparison_layout_of_all_pairs(benchmark):
+    # All pairs of 60 groups (1770 comparisons)
+    pairs = np.array(list(itertools.combinations(range(1, 61), 2)))
+    tops = np.random.default_rng(0).normal(size=61)
+    benchmark(comparison_layout, pairs[:, 0], pairs[:, 1], tops[pairs[:, 0]], tops[pairs[:, 1]])
@@ -0,0 +1,87 @@
+import pytest
+pytest.importorskip('pytest_benchmark')
+pd = pytest.importorskip('pandas')
+
+from docx import Document
+import numpy as np
+
+from playfair.docx import (
+    add_table_from_dataframe,
+    DefaultFormatter,
+    DocxFormatter,
+    IntegerFormatter,
+    RoundedFormatter,
+    TruncatedFormatter,
+    TruncatedPValueFormatter
+)
+
+_formatters = {
+    'default': DefaultFormatter(),
+    'integer': IntegerFormatter(),
+    'rounded': RoundedFormatter(2),
+    'truncated': TruncatedFormatter([0.01], [100], 2),
+    'p_value': TruncatedPValueFormatter()
+}
+
+def _column(nr_of_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(sigma=3, size=nr_of_rows)
+    values[::97] = np.nan
+    return values
+
+@pytest.mark.parametrize('formatter', sorted(_formatters))
+@pytest.mark.parametrize('nr_of_rows', [1000, 10000, 100000])
+def test_add_table_from_dataframe_bulk(benchmark, nr_of_rows, formatter):
+    dataframe = pd.DataFrame({'x': _column(nr_of_rows)})
+    formatters = {'x': _formatters[formatter]}
+
+    def setup():
+        return ((Document(), dataframe, formatters), dict(bulk=True))
+
+    benchmark.pedantic(add_table_from_dataframe, setup=setup, rounds=1 if nr_of_rows > 10000 else 3)
+
+@pytest.mark.parametrize('formatter', sorted(_formatters))
+def test_add_table_from_dataframe(benchmark, formatter):
+    # The python-docx code path is much slower, so only the smallest table is measured
+    dataframe = pd.DataFrame({'x': _column(1000)})
+    formatters = {'x': _formatters[formatter]}
+
+    def setup():
+        return ((Document(), dataframe, formatters), dict())
+
+    benchmark.pedantic(add_table_from_dataframe, setup=setup, rounds=3)
+
+@pytest.mark.parametrize('formatter', sorted(_formatters))
+def test_as_plaintext(benchmark, formatter):
+    values = _column(10000).tolist()
+    as_plaintext = _formatters[formatter].as_plaintext
+
+    def format_all():
+        for value in values:
+            as_plaintext(value)
+
+    benchmark(format_all)
+
+@pytest.mark.parametrize('formatter', sorted(_formatters))
+def test_format_column_as_plaintext(benchmark, formatter):
+    values = _column(10000)
+    benchmark(_formatters[formatter].format_column_as_plaintext, values)
+
+@pytest.mark.parametrize('cache', [False, True])
+@pytest.mark.parametrize('formatter', ['integer', 'p_value', 'rounded'])
+def test_as_plaintext_repeated_values(benchmark, formatter, cache):
+    # Tables often contain few distinct values, which the cache formats only once
+    rng = np.random.default_rng(0)
+    values = rng.choice(_column(50), size=100000).tolist()
+    as_plaintext = _formatters[formatter].as_plaintext
+
+    def format_all():
+        for value in values:
+            as_plaintext(value)
+
+    if cache:
+        DocxFormatter.enable_cache()
+    try:
+        benchmark(format_all)
+    finally:
+        DocxFormatter.disable_cache()
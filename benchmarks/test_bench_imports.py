@@ -0,0 +1,14 @@
+import subprocess
+import sys
+import os
+
+import pytest
+pytest.importorskip('pytest_benchmark')
+
+@pytest.mark.parametrize('module', ['playfair', 'playfair.docx', 'playfair.compare'])
+def test_import_time(benchmark, module):
+    # Each round imports the module in a fresh interpreter,
+    # so this includes the interpreter's own startup time
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    command = [sys.executable, '-c', 'import {}'.format(module)]
+    benchmark.pedantic(subprocess.check_call, args=(command,), kwargs=dict(env=env), rounds=5)
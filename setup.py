@@ -5,9 +5,16 @@ install_requirements = [
     'python-docx'
 ]
 
+extra_requirements = {
+    'stats': ['scipy']
+}
+
 test_requirements = [
     'hypothesis',
-    'pytest'
+    'pandas',
+    'pytest',
+    'pytest-benchmark',
+    'scipy'
 ]
 
 SHORT_DESCRIPTION = 'Utilities for visualizing and publishing research data'
@@ -33,6 +40,7 @@ setuptools.setup(
     author_email='tmbb@campus.ul.pt',
     license='MIT',
     install_requires=install_requirements,
+    extras_require=extra_requirements,
     test_requires=test_requirements,
     packages=setuptools.find_packages(where="src"),
     package_data={
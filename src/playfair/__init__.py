@@ -1 +1,12 @@
-__version__ = '0.1.0'
+__version__ = '0.1.0'
+
+import importlib
+
+_submodules = ['batch', 'boxstats', 'compare', 'display', 'docx', 'instrumentation', 'layout', 'stats']
+
+def __getattr__(name):
+    # Submodules are only imported when they are first used,
+    # so that `import playfair` doesn't import matplotlib or python-docx
+    if name in _submodules:
+        return importlib.import_module('playfair.' + name)
+    raise AttributeError("module 'playfair' has no attribute '{}'".format(name))
@@ -0,0 +1,83 @@
+"""
+Render many figures with comparison markers in parallel.
+"""
+import multiprocessing
+import time
+
+# Each worker process reuses a single figure for all the figures it renders
+_worker_figure = None
+
+class FigureSpec(object):
+    """
+    Everything needed to render a boxplot with comparison markers.
+
+    `groups` are the data for the boxplot and `comparisons` is a list
+    of `Comparison` objects between the groups. The figure is saved
+    to `path`, in the given `format` (guessed from `path` by default).
+    `options` are passed on to `add_comparisons_to_axes()`.
+    """
+
+    def __init__(self, groups, comparisons, path, format=None, labels=None,
+                 positions=None, size=None, ylim=None, dpi=None, options=None):
+        self.groups = groups
+        self.comparisons = comparisons
+        self.path = path
+        self.format = format
+        self.labels = labels
+        self.positions = positions
+        self.size = size
+        self.ylim = ylim
+        self.dpi = dpi
+        self.options = options if options is not None else dict()
+
+def _init_worker():
+    global _worker_figure
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    _worker_figure = Figure()
+
+def _render_figure(spec):
+    from matplotlib import rcParams
+    from playfair.compare import add_comparisons_to_axes
+
+    start = time.perf_counter()
+
+    # Clear the figure left behind by the previous spec instead of creating a new one
+    fig = _worker_figure
+    fig.clf()
+    fig.set_size_inches(spec.size if spec.size is not None else rcParams['figure.figsize'])
+
+    ax = fig.add_subplot(1, 1, 1)
+    positions = spec.positions
+    if positions is None:
+        positions = list(range(1, len(spec.groups) + 1))
+    ax.boxplot(spec.groups, positions=positions)
+    if spec.labels is not None:
+        ax.set_xticks(positions)
+        ax.set_xticklabels(spec.labels)
+
+    add_comparisons_to_axes(ax, spec.comparisons, **spec.options)
+    if spec.ylim is not None:
+        ax.set_ylim(*spec.ylim)
+
+    fig.savefig(spec.path, format=spec.format,
+                dpi=spec.dpi if spec.dpi is not None else 'figure')
+
+    return (spec.path, time.perf_counter() - start)
+
+def render_figures(specs, processes=None, maxtasksperchild=None, chunksize=1):
+    """
+    Render the figures described by `specs` (an iterable of `FigureSpec`)
+    in a pool of `processes` worker processes (by default, one per CPU),
+    all of them using the Agg backend.
+
+    Workers are recycled after `maxtasksperchild` figures
+    (by default they live until all figures are rendered).
+
+    Returns a list of `(path, seconds)` pairs with the time it took
+    to render and save each figure, in the same order as `specs`.
+    """
+    with multiprocessing.Pool(processes, initializer=_init_worker,
+                              maxtasksperchild=maxtasksperchild) as pool:
+        return list(pool.imap(_render_figure, specs, chunksize))
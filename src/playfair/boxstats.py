@@ -0,0 +1,157 @@
+"""
+Box plot statistics for groups which are too large to keep in memory.
+
+The statistics (and the top of each group, which is all that the comparison
+markers need) are computed in a single pass over the data, which can be
+an array (including memory-mapped arrays) or an iterable of chunks.
+"""
+import numpy as np
+
+class BoxStats(object):
+    """
+    Accumulates box plot statistics over chunks of data (NaNs are ignored).
+
+    With `method='exact'` all the values are kept (once), so that the quantiles
+    are exact. With `method='sample'` only a uniform random sample of
+    `sample_size` values is kept, and the quantiles and whiskers are estimated
+    from the sample. In both cases, the number of values, the mean, the minimum
+    and the maximum (the top of the group) are exact.
+    """
+
+    def __init__(self, method='sample', sample_size=100000, seed=None):
+        if method not in ('exact', 'sample'):
+            raise ValueError("unknown method: {!r}".format(method))
+        self.method = method
+        self.sample_size = sample_size
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+        self._chunks = []
+        # The sample keeps the values with the smallest random keys,
+        # which is a uniform sample of all the values seen so far
+        self._sample = np.empty(0)
+        self._keys = np.empty(0)
+
+    def update(self, chunk):
+        chunk = np.asarray(chunk, dtype=float).ravel()
+        chunk = chunk[~np.isnan(chunk)]
+        if len(chunk) == 0:
+            return self
+
+        self.count += len(chunk)
+        self.total += float(chunk.sum())
+        self.min = min(self.min, float(chunk.min()))
+        self.max = max(self.max, float(chunk.max()))
+
+        if self.method == 'exact':
+            self._chunks.append(chunk)
+        else:
+            sample = np.concatenate([self._sample, chunk])
+            keys = np.concatenate([self._keys, self._rng.random(len(chunk))])
+            if len(sample) > self.sample_size:
+                kept = np.argpartition(keys, self.sample_size)[:self.sample_size]
+                (sample, keys) = (sample[kept], keys[kept])
+            (self._sample, self._keys) = (sample, keys)
+
+        return self
+
+    def _values(self):
+        if self.method == 'exact':
+            self._chunks = [np.concatenate(self._chunks)] if self._chunks else []
+            return self._chunks[0] if self._chunks else np.empty(0)
+        return self._sample
+
+    def stats(self, whis=1.5, max_fliers=1000, label=None):
+        """
+        Return the statistics as a dict that can be given to `axes.bxp()`,
+        as computed by `matplotlib.cbook.boxplot_stats()`.
+
+        Only (up to) `max_fliers` outliers are kept, together with the
+        minimum and maximum if they are outliers.
+        The dict also contains the number of values (`'n'`) and the top of the group (`'top'`).
+        """
+        values = self._values()
+        if self.count == 0:
+            raise ValueError("no data")
+
+        (q1, med, q3) = np.percentile(values, [25, 50, 75])
+        iqr = q3 - q1
+        # Whiskers end at the most extreme values within `whis` IQRs of the box
+        (lo_limit, hi_limit) = (q1 - whis * iqr, q3 + whis * iqr)
+        inside = values[(values >= lo_limit) & (values <= hi_limit)]
+        whislo = self.min if self.min >= lo_limit else (inside.min() if len(inside) else q1)
+        whishi = self.max if self.max <= hi_limit else (inside.max() if len(inside) else q3)
+
+        fliers = values[(values < whislo) | (values > whishi)][:max_fliers]
+        # The extremes are always shown, even if they aren't in the sample
+        extremes = [value for value in (self.min, self.max) if value < whislo or value > whishi]
+        fliers = np.unique(np.concatenate([fliers, extremes]))
+
+        stats = {
+            'mean': self.total / self.count,
+            'iqr': iqr,
+            'cilo': med - 1.57 * iqr / np.sqrt(self.count),
+            'cihi': med + 1.57 * iqr / np.sqrt(self.count),
+            'whislo': whislo,
+            'whishi': whishi,
+            'fliers': fliers,
+            'q1': q1,
+            'med': med,
+            'q3': q3,
+            'n': self.count,
+            'top': self.max
+        }
+        if label is not None:
+            stats['label'] = label
+        return stats
+
+
+def _chunks(data, chunk_size):
+    # Arrays (and memory-mapped arrays) are read in slices,
+    # anything else must already be an iterable of chunks
+    if isinstance(data, np.ndarray):
+        data = data.ravel()
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+    else:
+        for chunk in data:
+            yield chunk
+
+def box_stats(data, method='sample', sample_size=100000, whis=1.5, max_fliers=1000,
+              label=None, chunk_size=2**20, seed=None):
+    """
+    Compute the box plot statistics of a group (see `BoxStats`)
+    in a single pass over `data`, which is an array or an iterable of chunks.
+    """
+    accumulator = BoxStats(method=method, sample_size=sample_size, seed=seed)
+    for chunk in _chunks(data, chunk_size):
+        accumulator.update(chunk)
+    return accumulator.stats(whis=whis, max_fliers=max_fliers, label=label)
+
+def boxplot(axes, groups, positions=None, labels=None, method='sample', sample_size=100000,
+            whis=1.5, max_fliers=1000, chunk_size=2**20, seed=None, **kwargs):
+    """
+    Draw a box plot of groups which may not fit in memory, with `axes.bxp()`.
+
+    Each group is an array (possibly memory-mapped) or an iterable of chunks,
+    and is read only once (see `box_stats()`). The other keyword arguments
+    are passed to `axes.bxp()`.
+
+    Returns the artists from `axes.bxp()` and a dict with the top of each group
+    by position, which can be given as `tops` to `add_comparisons_to_axes()`
+    (or used as the data of `Comparison` objects).
+    """
+    if positions is None:
+        positions = list(range(1, len(groups) + 1))
+    if labels is None:
+        labels = [None] * len(groups)
+
+    stats = [box_stats(group, method=method, sample_size=sample_size, whis=whis,
+                       max_fliers=max_fliers, label=label, chunk_size=chunk_size, seed=seed)
+             for (group, label) in zip(groups, labels)]
+    artists = axes.bxp(stats, positions=positions, **kwargs)
+    tops = dict((pos, group_stats['top']) for (pos, group_stats) in zip(positions, stats))
+
+    return (artists, tops)
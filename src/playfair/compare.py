@@ -1,17 +1,37 @@
 from matplotlib.lines import Line2D
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.path import Path
+from matplotlib.font_manager import FontProperties
+from matplotlib.textpath import TextPath
 from matplotlib import transforms, rcParams
-from matplotlib import pylab
+from matplotlib.axes import Axes
+import numpy as np
+import functools
+
+from playfair.layout import LayerStack, comparison_layout, comparison_layouts, packing_order
+from playfair import instrumentation
 
 
 # 1pt = 1/27 inches
 _pt = 1.0/72
 
-_MIN = -1e20
-
 def stars(n):
     return "✱" * n
 
 class Comparison(object):
+    """
+    A comparison between the groups at positions `pos1` and `pos2`.
+
+    The comparison marker is placed above the highest value of `data1`
+    and `data2`. Instead of the full data, `data1` and `data2` can be
+    the precomputed tops of the groups (as scalars, for example
+    from `group_tops()`), so that large arrays don't need to be kept alive
+    just to place the markers.
+
+    For many comparisons, a `ComparisonSet` takes much less memory.
+    """
+
+    __slots__ = ('text', 'data1', 'data2', 'pos1', 'pos2')
 
     def __init__(self, text, data1, data2, pos1=1, pos2=2):
         self.text = text
@@ -20,70 +40,166 @@ class Comparison(object):
         self.pos1 = pos1
         self.pos2 = pos2
 
-def _add_comparison_to_axes(axes, comparison, heights, nr_of_layers,
-                            debug=False, **kwargs):
+class ComparisonSet(object):
+    """
+    Many comparisons, stored by column.
+
+    `pos1`, `pos2`, `top1` and `top2` are arrays with the positions of the groups
+    and the tops of the groups (instead of the groups themselves).
+    The text of the i-th comparison is `labels[label_indices[i]]`,
+    so that each distinct label is stored only once.
+
+    Use `ComparisonSet.from_comparisons()` or `ComparisonSet.from_texts()`
+    to build a set from a list of `Comparison` objects or from a list of texts.
+    """
+
+    def __init__(self, pos1, pos2, top1, top2, label_indices, labels):
+        self.pos1 = np.asarray(pos1, dtype=float)
+        self.pos2 = np.asarray(pos2, dtype=float)
+        self.top1 = np.asarray(top1, dtype=float)
+        self.top2 = np.asarray(top2, dtype=float)
+        self.label_indices = np.asarray(label_indices, dtype=np.intp)
+        self.labels = list(labels)
+
+    @classmethod
+    def from_texts(cls, pos1, pos2, top1, top2, texts):
+        indices = dict()
+        label_indices = [indices.setdefault(text, len(indices)) for text in texts]
+        return cls(pos1, pos2, top1, top2, label_indices, list(indices))
+
+    @classmethod
+    def from_comparisons(cls, comparisons, tops=None):
+        """
+        Build a set from `Comparison` objects. The tops of the groups are
+        computed once (see `add_comparisons_to_axes()` for the `tops`).
+        """
+        comparisons = list(comparisons)
+        group_tops = _GroupTops(tops)
+        return cls.from_texts([marker.pos1 for marker in comparisons],
+                              [marker.pos2 for marker in comparisons],
+                              [group_tops.top(marker.data1, marker.pos1) for marker in comparisons],
+                              [group_tops.top(marker.data2, marker.pos2) for marker in comparisons],
+                              [marker.text for marker in comparisons])
+
+    def __len__(self):
+        return len(self.pos1)
+
+    def texts(self):
+        return [self.labels[i] for i in self.label_indices.tolist()]
+
+    def take(self, indices):
+        """
+        Return a set with the comparisons at the given indices, in that order.
+        """
+        return ComparisonSet(self.pos1[indices], self.pos2[indices],
+                             self.top1[indices], self.top2[indices],
+                             self.label_indices[indices], self.labels)
+
+def group_tops(groups, positions=None):
+    """
+    Compute the top (the maximum, ignoring NaNs) of each group only once.
+
+    Returns a dict that maps each position to the top of the group at that position.
+    As in `axes.boxplot()`, the default positions are 1, 2, ..., len(groups).
+    The result can be passed to `add_comparisons_to_axes()` as `tops`.
+    """
+    if positions is None:
+        positions = range(1, len(groups) + 1)
+
+    return dict((pos, float(np.nanmax(group))) for (pos, group) in zip(positions, groups))
+
+class _GroupTops(object):
+    """
+    A cache for the tops of the groups being compared.
+
+    Tops given explicitly are keyed by position.
+    Otherwise, the top of each data array is computed once
+    and shared by all the comparisons which refer to the same array.
+    """
 
+    def __init__(self, tops=None):
+        self._by_position = dict(tops) if tops else dict()
+        # Keyed by the id of the array, which is safe because
+        # the comparisons keep the arrays alive while we use the cache
+        self._by_data = dict()
+
+    def top(self, data, pos):
+        top = self._by_position.get(pos)
+        if top is not None:
+            return top
+        # The top has been precomputed by the user
+        if np.ndim(data) == 0:
+            return float(data)
+
+        key = id(data)
+        top = self._by_data.get(key)
+        if top is None:
+            top = float(np.nanmax(data))
+            self._by_data[key] = top
+        return top
+
+def _comparison_columns(comparisons, tops=None):
+    """
+    The positions, tops of the groups and texts of the comparisons,
+    which can be a `ComparisonSet` or a list of `Comparison` objects.
+    """
+    if isinstance(comparisons, ComparisonSet):
+        (top1, top2) = (comparisons.top1, comparisons.top2)
+        if tops:
+            # Tops given by position take precedence, as for `Comparison` objects
+            (top1, top2) = (top1.copy(), top2.copy())
+            for (pos, top) in tops.items():
+                top1[comparisons.pos1 == pos] = top
+                top2[comparisons.pos2 == pos] = top
+        return (comparisons.pos1, comparisons.pos2, top1, top2, comparisons.texts())
+
+    group_tops = _GroupTops(tops)
+    return ([marker.pos1 for marker in comparisons],
+            [marker.pos2 for marker in comparisons],
+            [group_tops.top(marker.data1, marker.pos1) for marker in comparisons],
+            [group_tops.top(marker.data2, marker.pos2) for marker in comparisons],
+            [marker.text for marker in comparisons])
+
+def _reorder(column, order):
+    if isinstance(column, np.ndarray):
+        return column[order]
+    return [column[i] for i in order]
+
+def _comparison_layout(pos1, pos2, top1, top2, stack=None, cache=None):
+    """
+    Place the comparison markers above the tops of their groups
+    (see `playfair.layout.comparison_layout()`).
+    """
     font_size = rcParams['font.size']
-    delta_y_bottom = (font_size * 1.4) * _pt
-    delta_y_top = (font_size * 1.2) * _pt
-    text_padding_bottom = (font_size * 0.6) * _pt
+    if cache is not None and stack is None:
+        return cache.layout(pos1, pos2, top1, top2, font_size)
+    return comparison_layout(pos1, pos2, top1, top2, font_size=font_size, stack=stack)
+
+def _debug_colors():
+    # pyplot is only imported in debug mode, because it's slow to import
+    from matplotlib import pyplot
+    cm = pyplot.get_cmap('Set1')
+    return list(cm(1.*i/5) for i in range(5))
+
+def _add_comparison_to_axes(axes, pos1, pos2, text, geometry, debug=False, with_label=True, **kwargs):
 
     fig = axes.get_figure()
-    # Extract parameters from significance marker
-    text = comparison.text
-    data1 = comparison.data1
-    data2 = comparison.data2
-    pos1 = comparison.pos1
-    pos2 = comparison.pos2
-
-    dy_left = heights.get(pos1, _MIN)
-    dy_right = heights.get(pos2, _MIN)
-    # the dy for the horizontal bar must be higher than the y-position
-    # for markers so that the new marker remains above all the ones
-    # that were added before
-    dy_middle = max(heights.get(pos, _MIN) for pos in range(pos1, pos2 + 1))
-
-    # We need to account for the number of layers.
-    # The number of layers reflects the number of stacked comparisons.
-    # The number of layers is relevant for the placement of the left, middle and right segments.
-
-    # The number of layers we need to account for when drawing the s1, s2, s4, and s5 segments
-    # is quite obvious
-    nr_of_layers_left = nr_of_layers.get(pos1, 0)
-    nr_of_layers_right = nr_of_layers.get(pos2, 0)
-    # The number of layers we need to account for when drawing the s3 segment is more complex.
-    # We need to account for all layers between pos1 and pos2, so we simply take the maximum.
-    nr_of_layers_middle = max(nr_of_layers.get(pos, 0) for pos in range(pos1, pos2 + 1))
+
+    (max_left, max_right, max_all,
+     delta_y_bottom_left,
+     delta_y_bottom_right,
+     delta_y_middle,
+     delta_y_text) = geometry
 
     color = kwargs.get('color', 'black')
     linewidth = kwargs.get('linewidth', 1)
 
     if debug:
-        cm = pylab.get_cmap('Set1')
-        [color_s1, color_s2, color_s3, color_s4, color_s5] = \
-            list(cm(1.*i/5) for i in range(5))
+        [color_s1, color_s2, color_s3, color_s4, color_s5] = _debug_colors()
     else:
         [color_s1, color_s2, color_s3, color_s4, color_s5] = \
             [color, color, color, color, color]
 
-    figure = axes.get_figure()
-    delta_y_total = delta_y_bottom + delta_y_top + text_padding_bottom
-
-    delta_y_bottom_left = delta_y_bottom + (delta_y_total * nr_of_layers_left)
-    delta_y_bottom_right = delta_y_bottom + (delta_y_total * nr_of_layers_right)
-    delta_y_bottom_middle = max([
-        delta_y_bottom_left,
-        delta_y_bottom_right,
-        delta_y_bottom + (delta_y_total * nr_of_layers_middle)
-    ])
-
-    delta_y_text = delta_y_bottom_middle + delta_y_top + text_padding_bottom
-
-    max_left = max(max(data1), dy_left)
-    max_right = max(max(data2), dy_right)
-    max_all = max(max(max_left, max_right), dy_middle)
-
-
     offset_s1 = transforms.ScaledTranslation(0, delta_y_bottom_left, fig.dpi_scale_trans)
     transform_s1 = axes.transData + offset_s1
     s1 = Line2D([pos1, pos1], [max_left, max_all],
@@ -95,14 +211,14 @@ def _add_comparison_to_axes(axes, comparison, heights, nr_of_layers,
 
     offset_s2 = transforms.ScaledTranslation(pos1, max_all, axes.transData)
     transform_s2 = fig.dpi_scale_trans + offset_s2
-    s2 = Line2D([0, 0], [delta_y_bottom_left, delta_y_bottom_middle + delta_y_top],
+    s2 = Line2D([0, 0], [delta_y_bottom_left, delta_y_middle],
                 transform=transform_s2,
                 color=color_s2,
                 linewidth=linewidth,
                 label='s2',
                 **kwargs)
 
-    offset_s3 = transforms.ScaledTranslation(0, delta_y_bottom_middle + delta_y_top, fig.dpi_scale_trans)
+    offset_s3 = transforms.ScaledTranslation(0, delta_y_middle, fig.dpi_scale_trans)
     transform_s3 = axes.transData + offset_s3
     s3 = Line2D([pos1, pos2], [max_all, max_all],
                 transform=transform_s3,
@@ -113,7 +229,7 @@ def _add_comparison_to_axes(axes, comparison, heights, nr_of_layers,
 
     offset_s4 = transforms.ScaledTranslation(pos2, max_all, axes.transData)
     transform_s4 = fig.dpi_scale_trans + offset_s4
-    s4 = Line2D([0, 0], [delta_y_bottom_right, delta_y_bottom_middle + delta_y_top],
+    s4 = Line2D([0, 0], [delta_y_bottom_right, delta_y_middle],
                 transform=transform_s4,
                 color=color_s4,
                 linewidth=linewidth,
@@ -132,6 +248,18 @@ def _add_comparison_to_axes(axes, comparison, heights, nr_of_layers,
     for line_segment in [s1, s2, s3, s4, s5]:
         axes.add_line(line_segment)
 
+    if not with_label:
+        return [s1, s2, s3, s4, s5]
+
+    label = _add_comparison_label(axes, pos1, pos2, text, geometry)
+
+    return [s1, s2, s3, s4, s5, label]
+
+def _add_comparison_label(axes, pos1, pos2, text, geometry):
+    fig = axes.get_figure()
+    max_all = geometry[2]
+    delta_y_text = geometry[6]
+
     q_x = (pos1 + pos2)/2
     q_y = max_all
 
@@ -141,9 +269,190 @@ def _add_comparison_to_axes(axes, comparison, heights, nr_of_layers,
                       horizontalalignment='center',
                       transform=transform_text)
 
-    return (max_all, label)
+    return label
+
+class _BracketCollection(LineCollection):
+    """
+    A `LineCollection` in which each vertex is given in data coordinates
+    plus a vertical offset in inches.
 
-def add_comparisons_to_axes(axes, comparisons, **kwargs):
+    This is what the s1-s5 segments of a comparison marker need,
+    and it allows us to draw all the markers in an axes
+    with a single artist instead of five `Line2D` artists per marker.
+    """
+
+    def __init__(self, segments, offsets, **kwargs):
+        self._data_segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+        self._inch_offsets = np.asarray(offsets, dtype=float).reshape(-1, 2)
+        super().__init__(self._data_segments, **kwargs)
+        # The paths are returned already in display coordinates
+        self.set_transform(transforms.IdentityTransform())
+
+    def get_paths(self):
+        # While the collection hasn't been added to an axes
+        # we can't convert anything into display coordinates
+        if self.axes is None:
+            return super().get_paths()
+
+        points = self.axes.transData.transform(self._data_segments.reshape(-1, 2))
+        dy = self.figure.dpi_scale_trans.transform(
+            np.column_stack([np.zeros(points.shape[0]), self._inch_offsets.ravel()]))
+        points[:, 1] += dy[:, 1]
+        return [Path(segment) for segment in points.reshape(-1, 2, 2)]
+
+    def set_brackets(self, segments, offsets):
+        self._data_segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+        self._inch_offsets = np.asarray(offsets, dtype=float).reshape(-1, 2)
+        self.set_segments(self._data_segments)
+
+def _add_comparisons_to_axes_batched(axes, pos1, pos2, texts, layout, debug=False, label_paths=False, **kwargs):
+    color = kwargs.pop('color', 'black')
+    linewidth = kwargs.pop('linewidth', 1)
+    # Match the caps of the `Line2D` artists so that the corners look the same
+    kwargs.setdefault('capstyle', rcParams['lines.solid_capstyle'])
+
+    if debug:
+        segment_colors = _debug_colors()
+    else:
+        segment_colors = [color] * 5
+
+    if not texts:
+        return []
+
+    if label_paths:
+        labels = [_add_comparison_labels_as_paths(axes, texts, layout)]
+    else:
+        labels = [_add_comparison_label(axes, p1, p2, text, layout.geometry(i))
+                  for (i, (p1, p2, text)) in enumerate(zip(pos1, pos2, texts))]
+
+    brackets = _BracketCollection(layout.segments, layout.offsets,
+                                  colors=segment_colors * len(texts),
+                                  linewidths=linewidth,
+                                  **kwargs)
+    axes.add_collection(brackets, autolim=False)
+    # The offsets in inches don't count towards the data limits
+    axes.update_datalim(brackets._data_segments.reshape(-1, 2))
+    axes.autoscale_view()
+
+    return [brackets] + labels
+
+@functools.lru_cache(maxsize=1024)
+def _label_path(text, font_properties):
+    """
+    The outline of a label (in points), centered horizontally
+    and with the baseline at the origin, as in `axes.text()`.
+
+    Outlines don't depend on the DPI, so parsing (mathtext)
+    and laying out each label only happens once per process.
+    """
+    if not text:
+        return Path(np.empty((0, 2)))
+    path = TextPath((0, 0), text, prop=font_properties)
+    extents = path.get_extents()
+    return Path(path.vertices - ((extents.x0 + extents.x1) / 2, 0), path.codes)
+
+def _label_height(text, font_properties):
+    """
+    The height (in points) of a label above its baseline.
+    """
+    if not text:
+        return 0.0
+    return max(_label_path(text, font_properties).get_extents().y1, 0.0)
+
+def _add_comparison_labels_as_paths(axes, texts, layout):
+    # All labels are drawn as a single collection of (cached) text outlines
+    fig = axes.get_figure()
+    font_properties = FontProperties(size=rcParams['font.size'])
+    paths = []
+    for (text, delta_y_text) in zip(texts, layout.offset_text.tolist()):
+        path = _label_path(text, font_properties)
+        # The offset of each label (in inches) is added to its outline (in points)
+        paths.append(Path(path.vertices + (0, delta_y_text * 72), path.codes))
+
+    labels = PathCollection(paths,
+                            offsets=layout.text_anchors,
+                            offset_transform=axes.transData,
+                            transform=transforms.Affine2D().scale(_pt) + fig.dpi_scale_trans,
+                            facecolors=rcParams['text.color'],
+                            edgecolors='none',
+                            linewidths=0)
+    axes.add_collection(labels, autolim=False)
+    return labels
+
+def _needed_ylim(axes, texts, layout, measure_labels=False):
+    """
+    The y-limits with which all comparison markers fit inside the axes.
+
+    Because the markers are offset by a fixed distance (in inches)
+    from the data, the upper limit can be computed directly from
+    the size of the axes, without drawing the figure.
+    This assumes a linear y-scale.
+    """
+    fig = axes.get_figure()
+    font_size = rcParams['font.size']
+    padding_top = (font_size * 0.6) * _pt
+    axes_height = axes.get_position().height * fig.get_size_inches()[1]
+    (y_bottom, y_top) = axes.get_ylim()
+
+    font_properties = FontProperties(size=font_size)
+    for (text, max_all, delta_y_text) in zip(texts, layout.max_all.tolist(),
+                                             layout.offset_text.tolist()):
+        if measure_labels:
+            label_height = _label_height(text, font_properties) * _pt
+        else:
+            # Labels are rarely taller than the font size
+            label_height = font_size * _pt
+
+        offset = delta_y_text + label_height + padding_top
+        # If the offset is larger than the axes themselves
+        # no y-limit will make the marker fit
+        if offset < axes_height:
+            # The top of the marker (in inches from the bottom of the axes) is:
+            #   axes_height * (max_all - y_bottom) / (y_top - y_bottom) + offset
+            # and it must not be higher than axes_height.
+            y_needed = y_bottom + (max_all - y_bottom) * axes_height / (axes_height - offset)
+            y_top = max(y_top, y_needed)
+
+    return (y_bottom, y_top)
+
+def _fit_ylim(axes, texts, layout, measure_labels=False):
+    """
+    Set the upper y-limit so that all comparison markers fit inside the axes.
+    """
+    axes.set_ylim(*_needed_ylim(axes, texts, layout, measure_labels=measure_labels))
+
+def _draw_comparisons(axes, pos1, pos2, texts, layout, batched=False, label_paths=False, **kwargs):
+    if batched:
+        return _add_comparisons_to_axes_batched(axes, pos1, pos2, texts, layout,
+                                                label_paths=label_paths, **kwargs)
+
+    artists = []
+    for (i, (p1, p2, text)) in enumerate(zip(pos1, pos2, texts)):
+        artists.extend(_add_comparison_to_axes(axes, p1, p2, text, layout.geometry(i),
+                                               with_label=not label_paths, **kwargs))
+    if label_paths and texts:
+        artists.append(_add_comparison_labels_as_paths(axes, texts, layout))
+    return artists
+
+def _save_comparisons(axes, layout, artists):
+    (heights, nr_of_layers) = layout.as_dicts()
+
+    recorder = instrumentation.active()
+    if recorder is not None:
+        recorder.count('compare.layout_calls')
+        recorder.count('compare.comparisons', len(layout))
+        recorder.count('compare.artists', len(artists))
+        recorder.maximum('compare.max_layers', max(nr_of_layers.values(), default=0))
+
+    # We save this data in the axes in case we want to do something with it in the future
+    axes.__comparison_data = (heights, nr_of_layers)
+    axes.__comparison_artists = artists
+
+    return (heights, nr_of_layers)
+
+def add_comparisons_to_axes(axes, comparisons, batched=False, tops=None,
+                            fit_ylim=False, measure_labels=False, layout_cache=None,
+                            pack=False, label_paths=False, **kwargs):
     """
     Add pairwise comparisons to plots in the same axis.
 
@@ -151,27 +460,323 @@ def add_comparisons_to_axes(axes, comparisons, **kwargs):
     but you might have to manually adjust the axis limits to guarantee
     that comparison markers are drawn inside the axes
     (otherwise they will be invisible)
+
+    Comparisons are stacked in the order in which they are given.
+    If `pack` is true, they are reordered so that they are stacked in
+    as few layers as possible (see `playfair.layout.packing_order()`).
+
+    If `fit_ylim` is true, the upper y-limit is raised just enough for
+    the markers to fit, without having to draw the figure.
+    Set the size of the figure before adding the comparisons,
+    because the limit depends on the height of the axes (in inches).
+    The height of the labels is estimated from the font size,
+    which is enough for stars. For other labels, set `measure_labels`
+    to measure the height of each label (the measurements are cached).
+
+    By default each comparison marker is drawn as five `Line2D` artists.
+    If `batched` is true, the line segments of all markers are drawn
+    as a single `LineCollection` instead, which is much faster to draw
+    and to save when there are many comparisons.
+    The labels are drawn as one text artist per comparison, unless `label_paths`
+    is true, in which case they are drawn as a single `PathCollection`
+    with the outlines of the labels. Each distinct label is only laid out
+    once per process, which is much faster when there are many labels,
+    but the labels can't be edited (for example in an SVG file) as text.
+    The artists that were created are saved in the axes
+    as `axes.__comparison_artists`, so that `len(axes.__comparison_artists)`
+    reports how many artists were added.
+
+    The top of each group is computed only once, even if it's used
+    by many comparisons. If you already know the tops of the groups
+    (see `group_tops()`), pass them as `tops`, a dict keyed by position.
+
+    If the same comparisons are drawn many times (for example, in different
+    formats), pass a `playfair.layout.LayoutCache` as `layout_cache`
+    so that the markers are only placed once.
+
+    The comparisons can be a list of `Comparison` objects or a `ComparisonSet`.
+    """
+    if not isinstance(comparisons, ComparisonSet):
+        comparisons = list(comparisons)
+    columns = _comparison_columns(comparisons, tops)
+    if pack:
+        order = packing_order(columns[0], columns[1])
+        columns = [_reorder(column, order) for column in columns]
+    (pos1, pos2, top1, top2, texts) = columns
+
+    with instrumentation.timer('compare.layout'):
+        layout = _comparison_layout(pos1, pos2, top1, top2, cache=layout_cache)
+
+    with instrumentation.timer('compare.artists'):
+        artists = _draw_comparisons(axes, pos1, pos2, texts, layout, batched=batched,
+                                    label_paths=label_paths, **kwargs)
+
+    if fit_ylim:
+        with instrumentation.timer('compare.fit_ylim'):
+            _fit_ylim(axes, texts, layout, measure_labels=measure_labels)
+
+    return _save_comparisons(axes, layout, artists)
+
+def add_comparisons_to_figure(figure, comparisons_by_axes, batched=True, tops=None, fit_ylim=False,
+                              measure_labels=False, layout_cache=None, pack=False, label_paths=False,
+                              **kwargs):
     """
-    heights = dict()
-    nr_of_layers = dict()
-    last_label = None
-    for marker in comparisons:
-        pos1 = marker.pos1
-        pos2 = marker.pos2
-        (max_height, label) = _add_comparison_to_axes(axes, marker, heights, nr_of_layers, **kwargs)
-        last_label = label
-        # range(a, b) is exclusive on the upper bound
-        nr_of_layers_for_envelopped_positions = max(nr_of_layers.get(p, 0) for p in range(pos1, pos2 + 1)) + 1
-        for pos in range(pos1, pos2 + 1):
-            # Update the heights for all the positions between
-            # the start and end positions of the marker
-            heights[pos] = max_height
-            # Update the number of layers above pos
-            # the number of layers is important to correctly account
-            # for the data-independent padding
-            nr_of_layers[pos] = nr_of_layers_for_envelopped_positions
+    Add pairwise comparisons to many axes of `figure` at once.
 
-    # We save this data in the axes in case we want to do something with it in the future
-    axes.__comparison_data = (heights, nr_of_layers)
+    `comparisons_by_axes` maps each axes (or its index in `figure.axes`)
+    to its comparisons (a list of `Comparison` objects or a `ComparisonSet`),
+    as a dict or as a list of `(axes, comparisons)` pairs. The other arguments are the same as
+    for `add_comparisons_to_axes()`, but the markers are batched by default.
+
+    Panels with comparisons between the same positions (in the same order)
+    are laid out together (see `playfair.layout.comparison_layouts()`),
+    unless a `layout_cache` is given, in which case the layout of each panel
+    is taken from the cache (or added to it).
+    If `fit_ylim` is true, axes which share their y-axis get the same
+    y-limits, with which the markers fit inside all of them.
 
-    return (heights, nr_of_layers)
\ No newline at end of file
+    Returns a dict which maps each axes to its `(heights, nr_of_layers)`.
+    """
+    items = list(comparisons_by_axes.items()) if hasattr(comparisons_by_axes, 'items') \
+        else list(comparisons_by_axes)
+
+    panels = []
+    # Panels with the same positions, by positions
+    structures = dict()
+    for (axes, comparisons) in items:
+        if not isinstance(axes, Axes):
+            axes = figure.axes[axes]
+        if not isinstance(comparisons, ComparisonSet):
+            comparisons = list(comparisons)
+        columns = _comparison_columns(comparisons, tops)
+        if pack:
+            order = packing_order(columns[0], columns[1])
+            columns = [_reorder(column, order) for column in columns]
+        key = (tuple(np.asarray(columns[0]).tolist()), tuple(np.asarray(columns[1]).tolist()))
+        structures.setdefault(key, []).append(len(panels))
+        panels.append((axes, columns))
+
+    layouts = [None] * len(panels)
+    with instrumentation.timer('compare.layout'):
+        font_size = rcParams['font.size']
+        for ((pos1, pos2), indices) in structures.items():
+            if layout_cache is not None:
+                for i in indices:
+                    (panel_pos1, panel_pos2, panel_top1, panel_top2, _texts) = panels[i][1]
+                    layouts[i] = _comparison_layout(panel_pos1, panel_pos2, panel_top1, panel_top2,
+                                                    cache=layout_cache)
+                continue
+            top1 = np.array([np.asarray(panels[i][1][2], dtype=float) for i in indices]).reshape(len(indices), -1)
+            top2 = np.array([np.asarray(panels[i][1][3], dtype=float) for i in indices]).reshape(len(indices), -1)
+            for (i, layout) in zip(indices, comparison_layouts(pos1, pos2, top1, top2, font_size)):
+                layouts[i] = layout
+
+    all_artists = []
+    with instrumentation.timer('compare.artists'):
+        for ((axes, (pos1, pos2, _top1, _top2, texts)), layout) in zip(panels, layouts):
+            all_artists.append(_draw_comparisons(axes, pos1, pos2, texts, layout, batched=batched,
+                                                 label_paths=label_paths, **kwargs))
+
+    if fit_ylim:
+        with instrumentation.timer('compare.fit_ylim'):
+            # Axes which share their y-axis must have the same limits
+            shared = dict()
+            for (i, (axes, _columns)) in enumerate(panels):
+                siblings = axes.get_shared_y_axes().get_siblings(axes)
+                shared.setdefault(min(id(sibling) for sibling in siblings), []).append(i)
+
+            for indices in shared.values():
+                ylims = [_needed_ylim(panels[i][0], panels[i][1][4], layouts[i],
+                                      measure_labels=measure_labels) for i in indices]
+                y_bottom = min(y_bottom for (y_bottom, _y_top) in ylims)
+                y_top = max(y_top for (_y_bottom, y_top) in ylims)
+                for i in indices:
+                    panels[i][0].set_ylim(y_bottom, y_top)
+
+    return dict((axes, _save_comparisons(axes, layout, artists))
+                for ((axes, _columns), layout, artists) in zip(panels, layouts, all_artists))
+
+
+class ComparisonOverlay(object):
+    """
+    Comparison markers which can be added to and removed from the axes
+    one at a time, for interactive figures.
+
+    Markers are stacked as in `add_comparisons_to_axes(..., batched=True)`,
+    in the order in which they were added. When a marker is added or removed,
+    only the markers after it are placed again, and only the ones which
+    have moved are updated.
+
+    If `blit` is true, the markers are drawn on top of a saved copy
+    of the rest of the figure (which is taken every time the figure is drawn),
+    so that adding or removing a marker doesn't redraw the whole figure.
+    If anything else in the figure changes, draw the figure again
+    (for example with `figure.canvas.draw_idle()`).
+    Without blitting (or if the canvas doesn't support it) the figure is
+    redrawn after each change. Saved figures always include the markers.
+
+    The overlay doesn't change the limits of the axes.
+    `debug`, `color`, `linewidth` and the other keyword arguments
+    (which are passed to the collection of brackets) are as in
+    `add_comparisons_to_axes(..., batched=True)`.
+    """
+
+    def __init__(self, axes, comparisons=(), tops=None, blit=True, **kwargs):
+        self.axes = axes
+        self.comparisons = []
+        self._tops = tops
+        self._blit = blit
+        self._background = None
+        # The comparisons with the tops of their groups already computed,
+        # and their geometry, segments and label
+        self._placed = []
+        self._geometries = []
+        self._segments = []
+        self._labels = []
+
+        debug = kwargs.pop('debug', False)
+        color = kwargs.pop('color', 'black')
+        linewidth = kwargs.pop('linewidth', 1)
+        kwargs.setdefault('capstyle', rcParams['lines.solid_capstyle'])
+        # Each marker has five segments, so the colors are repeated for each marker
+        colors = _debug_colors() if debug else [color]
+        self._brackets = _BracketCollection([], [], colors=colors, linewidths=linewidth,
+                                            animated=blit, **kwargs)
+        axes.add_collection(self._brackets, autolim=False)
+
+        self._draw_callback = axes.get_figure().canvas.mpl_connect('draw_event', self._on_draw)
+        # The names of these attributes are given as strings because
+        # `self.axes.__comparison_overlay` would be mangled inside the class
+        setattr(axes, '__comparison_overlay', self)
+
+        if comparisons:
+            self.extend(comparisons)
+
+    def add(self, comparison):
+        """
+        Add a comparison marker on top of the existing ones.
+        """
+        self.extend([comparison])
+
+    def extend(self, comparisons):
+        comparisons = list(comparisons)
+        tops = _GroupTops(self._tops)
+        start = len(self.comparisons)
+        for comparison in comparisons:
+            self.comparisons.append(comparison)
+            self._placed.append(Comparison(comparison.text,
+                                           tops.top(comparison.data1, comparison.pos1),
+                                           tops.top(comparison.data2, comparison.pos2),
+                                           comparison.pos1, comparison.pos2))
+        self._update(start)
+
+    def remove(self, comparison):
+        """
+        Remove a comparison marker (which must be one of the comparisons
+        that were added, not an equivalent one).
+        """
+        for (i, other) in enumerate(self.comparisons):
+            if other is comparison:
+                break
+        else:
+            raise ValueError("the comparison isn't in the overlay")
+
+        del self.comparisons[i]
+        del self._placed[i]
+        del self._geometries[i]
+        del self._segments[i]
+        self._labels.pop(i).remove()
+        self._update(i)
+
+    def clear(self):
+        for label in self._labels:
+            label.remove()
+        self.comparisons = []
+        self._placed = []
+        self._geometries = []
+        self._segments = []
+        self._labels = []
+        self._update(0)
+
+    def _update(self, start):
+        # The markers before `start` haven't changed, so they are only
+        # pushed into the stack again, without computing their geometry
+        stack = LayerStack([marker.pos1 for marker in self._placed] +
+                           [marker.pos2 for marker in self._placed])
+        for (marker, geometry) in zip(self._placed[:start], self._geometries[:start]):
+            stack.push(marker.pos1, marker.pos2, geometry[2])
+
+        placed = self._placed[start:]
+        layout = _comparison_layout([marker.pos1 for marker in placed],
+                                    [marker.pos2 for marker in placed],
+                                    [marker.data1 for marker in placed],
+                                    [marker.data2 for marker in placed],
+                                    stack=stack)
+        for (j, marker) in enumerate(placed):
+            i = start + j
+            geometry = layout.geometry(j)
+            if i == len(self._labels):
+                label = _add_comparison_label(self.axes, marker.pos1, marker.pos2, marker.text, geometry)
+                label.set_animated(self._blit)
+                self._labels.append(label)
+                self._geometries.append(geometry)
+                self._segments.append((layout.segments[j], layout.offsets[j]))
+            elif geometry != self._geometries[i]:
+                self._move_label(self._labels[i], marker, geometry)
+                self._geometries[i] = geometry
+                self._segments[i] = (layout.segments[j], layout.offsets[j])
+
+        self._brackets.set_brackets([segments for (segments, _offsets) in self._segments],
+                                    [offsets for (_segments, offsets) in self._segments])
+
+        setattr(self.axes, '__comparison_data', stack.as_dicts())
+        setattr(self.axes, '__comparison_artists', self.artists())
+        self._redraw()
+
+    def _move_label(self, label, marker, geometry):
+        fig = self.axes.get_figure()
+        offset_text = transforms.ScaledTranslation(0, geometry[6], fig.dpi_scale_trans)
+        label.set_position(((marker.pos1 + marker.pos2)/2, geometry[2]))
+        label.set_transform(self.axes.transData + offset_text)
+
+    def artists(self):
+        return [self._brackets] + self._labels
+
+    def _draw_artists(self):
+        for artist in self.artists():
+            self.axes.draw_artist(artist)
+
+    def _on_draw(self, event):
+        # Saved figures include the animated artists anyway
+        if not self._blit or event.canvas.is_saving():
+            return
+        self._background = event.canvas.copy_from_bbox(self.axes.get_figure().bbox)
+        self._draw_artists()
+
+    def _redraw(self):
+        canvas = self.axes.get_figure().canvas
+        if self._blit and self._background is not None and canvas.supports_blit:
+            canvas.restore_region(self._background)
+            self._draw_artists()
+            canvas.blit(self.axes.get_figure().bbox)
+        else:
+            canvas.draw_idle()
+
+    def disconnect(self):
+        """
+        Remove the markers from the axes.
+        """
+        self.clear()
+        self._brackets.remove()
+        self.axes.get_figure().canvas.mpl_disconnect(self._draw_callback)
+        setattr(self.axes, '__comparison_overlay', None)
+
+def comparison_overlay(axes, **kwargs):
+    """
+    Return the `ComparisonOverlay` attached to the axes,
+    creating it (with the given keyword arguments) if there isn't one.
+    """
+    overlay = getattr(axes, '__comparison_overlay', None)
+    if overlay is None:
+        overlay = ComparisonOverlay(axes, **kwargs)
+    return overlay
@@ -1,25 +1,90 @@
-import docx
 import os
+import io
 import math
+import copy
+import itertools
+import zipfile
+import collections
+import multiprocessing
+import time
+
+import numpy as np
+
+from playfair import instrumentation
+
+def _python_docx():
+    # python-docx is only imported when it's first used, so that
+    # importing this module is fast for code that doesn't need it
+    import docx
+    return docx
+
+# Paths of the templates, by name
+_templates = {
+    'styled': os.path.join(os.path.dirname(__file__), 'docx/styled-doc.docx')
+}
+# Parsed templates, by path, together with the modification time and size
+# of the file, so that we can tell when the file has changed
+_template_cache = dict()
+
+def register_template(name, path):
+    """
+    Register a .docx file as a template which can be used
+    with `new_document_from_template(name)`.
+    """
+    _templates[name] = os.path.abspath(path)
+
+def _load_template(path):
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_cache.get(path)
+    if cached is None or cached[0] != version:
+        with instrumentation.timer('docx.template_load'):
+            cached = (version, _python_docx().Document(path))
+        _template_cache[path] = cached
+    return cached[1]
+
+def new_document_from_template(name):
+    """
+    Create a new document from a registered template.
+
+    Each template is read and parsed only once (and again if the file changes).
+    Documents are independent copies of the parsed template.
+    """
+    return copy.deepcopy(_load_template(_templates[name]))
 
 def new_styled_document():
-    directory = os.path.dirname(__file__)
-    path = os.path.join(directory, 'docx/styled-doc.docx')
-    return docx.Document(path)
+    return new_document_from_template('styled')
 
 
-def _format_as_plaintext(formatter, value):
-    doc = docx.Document()
-    paragraph = doc.add_paragraph()
+# A paragraph reused by formatters which can only insert their values into paragraphs
+_scratch_paragraph = None
+
+def _get_scratch_paragraph():
+    global _scratch_paragraph
+    if _scratch_paragraph is None:
+        _scratch_paragraph = _python_docx().Document().add_paragraph()
+    # Remove whatever was inserted the last time the paragraph was used
+    del _scratch_paragraph._p[:]
+    return _scratch_paragraph
+
+
+def _format_as_runs(formatter, value):
+    paragraph = _get_scratch_paragraph()
     formatter.insert(paragraph, value)
-    plaintext = paragraph.text
-    return plaintext
+    return [(run.text, _run_style(run)) for run in paragraph.runs]
+
+
+def _run_style(run):
+    if run.bold:
+        return 'bold'
+    elif run.italic:
+        return 'italic'
+    else:
+        return None
 
 
-def _p_value_relation(paragraph, sign, p_value):
-    paragraph.add_run("p").italic = True
-    paragraph.add_run(" {} ".format(sign))
-    paragraph.add_run(p_value)
+def _p_value_relation(sign, p_value):
+    return [("p", 'italic'), (" {} ".format(sign), None), (p_value, None)]
 
 
 def _pretty_format_float(value, func):
@@ -41,40 +106,259 @@ def _round_float(f, nr_of_places):
 def _format_rounded_float(value, nr_of_places):
     return _pretty_format_float(value, lambda f: _round_float(f, nr_of_places))
 
+def _float_column(values):
+    # Returns the values as an array of floats,
+    # or None if they can't be converted without changing their meaning
+    array = np.asarray(values)
+    if array.dtype.kind in 'fiu':
+        return array.astype(float, copy=False)
+    else:
+        return None
+
+def _pretty_format_column(values, fmt):
+    # Vectorized version of `_pretty_format_float()`, in which finite values
+    # are formatted with the printf-style format `fmt`.
+    # Returns an array of strings (with dtype=object).
+    texts = np.empty(values.shape, dtype=object)
+    texts[np.isnan(values)] = 'NaN'
+    texts[values == float('inf')] = '+∞'
+    texts[values == -float('inf')] = '-∞'
+    finite = np.isfinite(values)
+    texts[finite] = [fmt % f for f in values[finite].tolist()]
+    return texts
+
+def _can_truncate_column(steps_less_than, steps_greater_than):
+    # The vectorized version requires the steps to be properly sorted,
+    # and that isn't the case if there are NaNs among them
+    return not any(math.isnan(step) for step in steps_less_than + steps_greater_than)
+
+def _truncate_column(values, steps_less_than, steps_greater_than, nr_of_places):
+    # Vectorized version of the truncation in `TruncatedFormatter.runs()`
+    # and `TruncatedPValueFormatter.runs()`.
+    # Returns the relation ('<', '>' or '=') between each value and its text
+    # and the text itself, which is either the value or the step it was truncated to.
+    texts = np.empty(values.shape, dtype=object)
+    relations = np.full(values.shape, '=', dtype=object)
+
+    # The first step greater than the value
+    steps = np.asarray(steps_less_than, dtype=float)
+    step_texts = np.array([_format_rounded_float(step, nr_of_places) for step in steps] + [''], dtype=object)
+    indices = np.searchsorted(steps, values, side='right')
+    below = indices < len(steps)
+    relations[below] = '<'
+    texts[below] = step_texts[indices[below]]
+
+    # The first step less than the value (steps_greater_than is sorted in reverse)
+    steps = np.asarray(steps_greater_than[::-1], dtype=float)
+    step_texts = np.array([''] + [_format_rounded_float(step, nr_of_places) for step in steps], dtype=object)
+    indices = np.searchsorted(steps, values, side='left')
+    above = (indices > 0) & ~np.isnan(values) & ~below
+    relations[above] = '>'
+    texts[above] = step_texts[indices[above]]
+
+    # Only the values which weren't truncated need to be formatted
+    kept = ~(below | above)
+    texts[kept] = _pretty_format_column(values[kept], "%%.%if" % nr_of_places)
+
+    return (relations, texts)
+
+FormatterCacheInfo = collections.namedtuple('FormatterCacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+class _FormatterCache(object):
+    """
+    A bounded LRU cache for the runs of formatted values.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._runs = collections.OrderedDict()
+
+    def get(self, key):
+        runs = self._runs.get(key)
+        if runs is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._runs.move_to_end(key)
+        return runs
+
+    def put(self, key, runs):
+        self._runs[key] = runs
+        if len(self._runs) > self.maxsize:
+            self._runs.popitem(last=False)
+
+    def info(self):
+        return FormatterCacheInfo(self.hits, self.misses, self.maxsize, len(self._runs))
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+# Only values of these types (and not of their subclasses) are cached.
+# Values of other types may be equal and still be formatted differently
+# (timestamps in different time zones, or Decimal('1.0') and Decimal('1.00'))
+_CACHED_TYPES = frozenset([float, int, bool, str])
+
+def _value_cache_key(config, value):
+    # Values which are equal may be formatted differently (1 and 1.0, or 0.0 and -0.0),
+    # and NaN isn't even equal to itself
+    if value != value:
+        return (config, type(value), 'NaN')
+    if value == 0:
+        return (config, type(value), value, math.copysign(1.0, value))
+    return (config, type(value), value)
+
 class DocxFormatter:
+    """
+    Formats values as runs of text inside a paragraph.
+
+    Subclasses define `runs(value)`, which returns a list of
+    `(text, style)` pairs, where style is `None`, `'bold'` or `'italic'`.
+    Formatters which only define `insert(paragraph, value)` are supported too.
+
+    Tables often contain many repeated values. Use `DocxFormatter.enable_cache()`
+    to cache the runs for each value (and formatter configuration) in a bounded
+    LRU cache shared by all formatters. Only floats, integers, booleans
+    and strings are cached.
+    """
+
+    _cache = None
+
+    @classmethod
+    def enable_cache(cls, maxsize=65536):
+        DocxFormatter._cache = _FormatterCache(maxsize)
+
+    @classmethod
+    def disable_cache(cls):
+        DocxFormatter._cache = None
+
+    @classmethod
+    def cache_info(cls):
+        """
+        Return the hits, misses, maximum size and current size of the cache
+        (or None if the cache isn't enabled).
+        """
+        cache = DocxFormatter._cache
+        return cache.info() if cache is not None else None
+
+    def __setattr__(self, name, value):
+        # The configuration changed, so its cache key must be computed again
+        self.__dict__.pop('_config_key', None)
+        object.__setattr__(self, name, value)
+
+    def _cache_config(self):
+        # The formatter's configuration, as part of the cache key,
+        # is computed only once (and not for each value)
+        config = self.__dict__.get('_config_key')
+        if config is None:
+            config = (type(self),) + tuple(sorted((name, _hashable(attribute))
+                                                  for (name, attribute) in vars(self).items()))
+            self.__dict__['_config_key'] = config
+        return config
+
+    def _cached_runs(self, value):
+        cache = DocxFormatter._cache
+        if cache is None or type(value) not in _CACHED_TYPES:
+            return self.runs(value)
+
+        try:
+            key = _value_cache_key(self.__dict__.get('_config_key') or self._cache_config(), value)
+            runs = cache.get(key)
+        except (TypeError, ValueError):
+            # Unhashable formatter attributes can't be cached
+            return self.runs(value)
+
+        if runs is None:
+            runs = self.runs(value)
+            cache.put(key, runs)
+        return runs
+
+    def runs(self, value):
+        if type(self).insert is DocxFormatter.insert:
+            raise NotImplementedError("formatters must define either runs() or insert()")
+        return _format_as_runs(self, value)
+
+    def insert(self, paragraph, value):
+        return _add_runs(paragraph, self._cached_runs(value))
+
+    def format_column(self, values):
+        """
+        Format a whole column of values (an array or a pandas Series) at once.
+
+        Returns a list with the runs for each of the values.
+        Subclasses vectorize this for numeric columns.
+        """
+        return [self._cached_runs(value) for value in values]
 
     def as_plaintext(self, value):
-        return _format_as_plaintext(self, value)
+        """
+        Format the value as text, without any styles.
+        """
+        return ''.join(text for (text, _style) in self._cached_runs(value))
+
+    def format_column_as_plaintext(self, values):
+        """
+        Format a whole column of values as text, without any styles.
+        """
+        return [''.join(text for (text, _style) in runs) for runs in self.format_column(values)]
 
 class IntegerFormatter(DocxFormatter):
 
     def __init__(self):
         pass
 
-    def insert(self, paragraph, value):
-        text = _format_float_as_integer(value)
-        paragraph.add_run(text)
-        return paragraph
+    def runs(self, value):
+        return [(_format_float_as_integer(value), None)]
+
+    def format_column(self, values):
+        array = np.asarray(values)
+        if array.dtype.kind in 'iu':
+            return [[(str(value), None)] for value in array.tolist()]
+
+        floats = _float_column(array)
+        if floats is None:
+            return super().format_column(values)
+        return [[(text, None)] for text in _pretty_format_column(floats, "%d")]
 
 class DefaultFormatter(DocxFormatter):
 
     def __init__(self):
         pass
 
-    def insert(self, paragraph, value):
-        text = str(value)
-        paragraph.add_run(text)
-        return paragraph
+    def runs(self, value):
+        return [(str(value), None)]
+
+    def format_column(self, values):
+        if not hasattr(values, 'dtype'):
+            # Converting a sequence of python values into an array would
+            # give all of them the same type (1 would be written as 1.0)
+            return [[(str(value), None)] for value in values]
+
+        array = np.asarray(values)
+        # Python scalars are converted to strings faster than numpy scalars
+        # (and in the same way, except for floats which aren't 64 bits long
+        # and for dates)
+        if array.dtype.kind in 'biuOU' or array.dtype == np.float64:
+            array = array.tolist()
+        return [[(str(value), None)] for value in array]
 
 class RoundedFormatter(DocxFormatter):
 
     def __init__(self, nr_of_places):
         self.nr_of_places = nr_of_places
 
-    def insert(self, paragraph, value):
-        text = _format_rounded_float(value, self.nr_of_places)
-        paragraph.add_run(text)
-        return paragraph
+    def runs(self, value):
+        return [(_format_rounded_float(value, self.nr_of_places), None)]
+
+    def format_column(self, values):
+        floats = _float_column(values)
+        if floats is None:
+            return super().format_column(values)
+        fmt = "%%.%if" % self.nr_of_places
+        return [[(text, None)] for text in _pretty_format_column(floats, fmt)]
 
 
 class TruncatedPValueFormatter(DocxFormatter):
@@ -84,22 +368,28 @@ class TruncatedPValueFormatter(DocxFormatter):
         self.steps_greater_than = sorted(steps_greater_than, reverse=True)
         self.nr_of_places = nr_of_places
 
-    def insert(self, paragraph, value):
+    def runs(self, value):
         for step in self.steps_less_than:
             if value < step:
                 p_value = _format_rounded_float(step, self.nr_of_places)
-                _p_value_relation(paragraph, "<", p_value)
-                return paragraph
+                return _p_value_relation("<", p_value)
 
         for step in self.steps_greater_than:
             if value > step:
                 p_value = _format_rounded_float(step, self.nr_of_places)
-                _p_value_relation(paragraph, ">", p_value)
-                return paragraph
+                return _p_value_relation(">", p_value)
 
         p_value = _format_rounded_float(value, self.nr_of_places)
-        _p_value_relation(paragraph, "=", p_value)
-        return paragraph
+        return _p_value_relation("=", p_value)
+
+    def format_column(self, values):
+        floats = _float_column(values)
+        if floats is None or not _can_truncate_column(self.steps_less_than, self.steps_greater_than):
+            return super().format_column(values)
+
+        (relations, p_values) = _truncate_column(floats, self.steps_less_than,
+                                                 self.steps_greater_than, self.nr_of_places)
+        return [_p_value_relation(sign, p_value) for (sign, p_value) in zip(relations, p_values)]
 
 
 class TruncatedFormatter(DocxFormatter):
@@ -109,42 +399,403 @@ class TruncatedFormatter(DocxFormatter):
         self.steps_greater_than = sorted(steps_greater_than, reverse=True)
         self.nr_of_places = nr_of_places
 
-    def insert(self, paragraph, value):
+    def runs(self, value):
         for step in self.steps_less_than:
             if value < step:
                 rounded_value = _format_rounded_float(step, self.nr_of_places)
                 text = "< {}".format(rounded_value)
-                paragraph.add_run(text)
-                return paragraph
+                return [(text, None)]
 
         for step in self.steps_greater_than:
             if value > step:
                 rounded_value = _format_rounded_float(step, self.nr_of_places)
                 text = "> {}".format(rounded_value)
-                paragraph.add_run(text)
-                return paragraph
+                return [(text, None)]
 
         p_value = _format_rounded_float(value, self.nr_of_places)
-        paragraph.add_run(p_value)
-        return paragraph
-
-
-def add_table_from_dataframe(document, dataframe, formatters=dict(), strip_index=True, caption=None):
-    table = document.add_table(rows=(dataframe.shape[0] + 1), cols=dataframe.shape[1])
-    # Insert columns into table
-    # Column names are simple strings, so this doesn't need much customization
-    for i, column in enumerate(dataframe.columns):
-        paragraph = table.cell(0, i).paragraphs[0]
-        paragraph.add_run(column).bold = True
-
-    # Dataframe values may be arbitrarily processed before being written
-    for i, column in enumerate(dataframe) :
-        for row in range(dataframe.shape[0]):
-            # See if we have a special inserter/formatter
+        return [(p_value, None)]
+
+    def format_column(self, values):
+        floats = _float_column(values)
+        if floats is None or not _can_truncate_column(self.steps_less_than, self.steps_greater_than):
+            return super().format_column(values)
+
+        (relations, texts) = _truncate_column(floats, self.steps_less_than,
+                                              self.steps_greater_than, self.nr_of_places)
+        prefixes = {'<': "< ", '>': "> ", '=': ""}
+        return [[(prefixes[relation] + text, None)] for (relation, text) in zip(relations, texts)]
+
+
+class _TableXmlBuilder(object):
+    """
+    Builds the `w:tr` elements of a table directly with lxml.
+
+    The cells and the (plain, bold and italic) runs are deep copies
+    of prebuilt templates, which is much faster than going through
+    the python-docx proxy objects for each cell.
+    `widths` are the widths of the columns (as python-docx lengths, or None).
+    """
+
+    _special_characters = frozenset('\t\n\r')
+
+    def __init__(self, widths):
+        from docx.oxml import parse_xml
+        from docx.oxml.ns import nsdecls, qn
+
+        self._qn = qn
+        self._tc_templates = []
+        for width in widths:
+            if width is None:
+                tc_xml = '<w:tc %s><w:p/></w:tc>' % nsdecls('w')
+            else:
+                tc_xml = ('<w:tc %s><w:tcPr><w:tcW w:type="dxa" w:w="%d"/></w:tcPr><w:p/></w:tc>' %
+                          (nsdecls('w'), width.twips))
+            self._tc_templates.append(parse_xml(tc_xml))
+
+        self._r_templates = {
+            None: parse_xml('<w:r %s><w:t/></w:r>' % nsdecls('w')),
+            'bold': parse_xml('<w:r %s><w:rPr><w:b/></w:rPr><w:t/></w:r>' % nsdecls('w')),
+            'italic': parse_xml('<w:r %s><w:rPr><w:i/></w:rPr><w:t/></w:r>' % nsdecls('w'))
+        }
+        self._tr_template = parse_xml('<w:tr %s/>' % nsdecls('w'))
+        self._tbl_template = parse_xml('<w:tbl %s/>' % nsdecls('w'))
+
+    def _r(self, text, style):
+        r = copy.deepcopy(self._r_templates[style])
+        if self._special_characters.isdisjoint(text):
+            t = r[-1]
+            t.text = text
+            if len(text.strip()) < len(text):
+                t.set(self._qn('xml:space'), 'preserve')
+        else:
+            # Let python-docx convert tabs and line breaks
+            r.text = text
+        return r
+
+    def row(self, cells):
+        """
+        Build a `w:tr` element from the runs for each of the cells.
+        """
+        tr = copy.deepcopy(self._tr_template)
+        for (tc_template, runs) in zip(self._tc_templates, cells):
+            tc = copy.deepcopy(tc_template)
+            p = tc[-1]
+            for (text, style) in runs:
+                p.append(self._r(text, style))
+            tr.append(tc)
+
+        recorder = instrumentation.active()
+        if recorder is not None:
+            recorder.count('docx.cells', len(tr))
+            recorder.count('docx.runs', sum(len(runs) for runs in cells))
+        return tr
+
+    def rows_xml(self, rows):
+        """
+        Serialize the `w:tr` elements for the given rows (each of them a list
+        with the runs for each cell) as UTF-8 encoded XML.
+        """
+        from lxml import etree
+
+        # The rows are serialized inside a table so that the namespace
+        # declarations aren't repeated in each of them
+        tbl = copy.deepcopy(self._tbl_template)
+        for cells in rows:
+            tbl.append(self.row(cells))
+        if len(tbl) == 0:
+            return b''
+        xml = etree.tostring(tbl, encoding='UTF-8', xml_declaration=False)
+        # Remove the start and end tags of the table
+        return xml[xml.index(b'>') + 1:xml.rindex(b'<')]
+
+
+class _ColumnPlan(object):
+    """
+    How to write a column of a table: its name, its values
+    and the formatter for those values, resolved only once.
+    """
+
+    def __init__(self, name, values, formatter):
+        self.name = name
+        self.values = values
+        self.formatter = formatter
+        self.timer_name = 'docx.format_column.{}'.format(name)
+
+    def header_runs(self):
+        return [(str(self.name), 'bold')]
+
+    def formatted(self):
+        # Formatters which only know how to insert values into paragraphs
+        # must be called for each value
+        if _only_defines_insert(self.formatter):
+            return None
+        with instrumentation.timer(self.timer_name):
+            return self.formatter.format_column(self.values)
+
+
+def _only_defines_insert(formatter):
+    return type(formatter).insert is not DocxFormatter.insert
+
+
+def _column_values(column):
+    # Numpy writes dates and durations differently from pandas
+    # (2020-01-01T00:00:00.000000000 instead of 2020-01-01 00:00:00),
+    # so they are kept as pandas objects
+    if column.dtype.kind in 'mM':
+        column = column.astype(object)
+    return column.to_numpy()
+
+def _plan_table(dataframe, formatters, strip_index):
+    plan = []
+    if not strip_index:
+        name = dataframe.index.name if dataframe.index.name is not None else ''
+        plan.append(_ColumnPlan(name, _column_values(dataframe.index),
+                                formatters.get(name, DefaultFormatter())))
+
+    for (i, column) in enumerate(dataframe.columns):
+        # Values are extracted by position, which is faster than by label
+        # and also works with any kind of index
+        plan.append(_ColumnPlan(column, _column_values(dataframe.iloc[:, i]),
+                                formatters.get(column, DefaultFormatter())))
+
+    return plan
+
+
+def _add_runs(paragraph, runs):
+    for (text, style) in runs:
+        run = paragraph.add_run(text)
+        if style == 'bold':
+            run.bold = True
+        elif style == 'italic':
+            run.italic = True
+    return paragraph
+
+
+def _format_plan(plan):
+    # Format each column all at once
+    formatted_columns = []
+    for column in plan:
+        formatted = column.formatted()
+        if formatted is None:
+            with instrumentation.timer(column.timer_name):
+                formatted = [column.formatter.runs(value) for value in column.values]
+        formatted_columns.append(formatted)
+
+    return zip(*formatted_columns)
+
+
+def _table_widths(table):
+    return [gridCol.w for gridCol in table._tbl.tblGrid.gridCol_lst]
+
+
+def _add_table_rows_bulk(table, plan):
+    # Fill an empty table (which already has the right style and grid) with rows
+    # built directly as XML. The table is inserted into the document only once.
+    tbl = table._tbl
+    builder = _TableXmlBuilder(_table_widths(table))
+
+    tbl.append(builder.row([column.header_runs() for column in plan]))
+    for cells in _format_plan(plan):
+        tbl.append(builder.row(cells))
+
+
+def _add_table_rows(table, plan):
+    from docx.table import _Cell
+
+    def add_row_paragraphs():
+        # Building the cells from the new row is much faster than `table.cell()`,
+        # which goes through all the cells in the table each time
+        tr = table.add_row()._tr
+        return [_Cell(tc, table).paragraphs[0] for tc in tr.tc_lst]
+
+    for (paragraph, column) in zip(add_row_paragraphs(), plan):
+        _add_runs(paragraph, column.header_runs())
+
+    formatted_columns = [column.formatted() for column in plan]
+    nr_of_rows = len(plan[0].values) if plan else 0
+    for row in range(nr_of_rows):
+        for (paragraph, column, formatted) in zip(add_row_paragraphs(), plan, formatted_columns):
+            if formatted is None:
+                with instrumentation.timer(column.timer_name):
+                    column.formatter.insert(paragraph, column.values[row])
+            else:
+                _add_runs(paragraph, formatted[row])
+
+    recorder = instrumentation.active()
+    if recorder is not None:
+        recorder.count('docx.cells', (nr_of_rows + 1) * len(plan))
+        recorder.count('docx.runs', len(table._tbl.xpath('.//w:r')))
+
+
+def add_table_from_dataframe(document, dataframe, formatters=dict(), strip_index=True, caption=None, bulk=False):
+    """
+    Add a table with the contents of a pandas dataframe to the document.
+
+    `formatters` maps column names to the `DocxFormatter` used to format
+    the values in that column (`DefaultFormatter` by default).
+    Unless `strip_index` is false, the index of the dataframe isn't included in the table.
+    If a `caption` is given, it's added in a paragraph above the table.
+    If `bulk` is true, the table is built directly as XML,
+    which is much faster for large tables.
+    """
+    if caption is not None:
+        style = 'Caption' if 'Caption' in document.styles else None
+        document.add_paragraph(caption, style=style)
+
+    plan = _plan_table(dataframe, formatters, strip_index)
+    table = document.add_table(rows=0, cols=len(plan))
+    if bulk:
+        _add_table_rows_bulk(table, plan)
+    else:
+        _add_table_rows(table, plan)
+
+    return table
+
+
+class TableSpec(object):
+    """
+    A table to be added by `add_tables_in_parallel()`,
+    with the same arguments as `add_table_from_dataframe()`.
+    """
+
+    def __init__(self, dataframe, formatters=dict(), strip_index=True, caption=None):
+        self.dataframe = dataframe
+        self.formatters = formatters
+        self.strip_index = strip_index
+        self.caption = caption
+
+    def nr_of_columns(self):
+        return self.dataframe.shape[1] + (0 if self.strip_index else 1)
+
+
+def _build_table_xml(spec_and_widths):
+    (spec, widths) = spec_and_widths
+    start = time.perf_counter()
+
+    plan = _plan_table(spec.dataframe, spec.formatters, spec.strip_index)
+    builder = _TableXmlBuilder(widths)
+    header = [column.header_runs() for column in plan]
+    xml = builder.rows_xml(itertools.chain([header], _format_plan(plan)))
+
+    return (xml, time.perf_counter() - start)
+
+
+def add_tables_in_parallel(document, specs, processes=None):
+    """
+    Add many tables (described by `TableSpec` objects) to the document.
+
+    The XML for the tables is built in a pool of `processes` worker processes
+    (by default, one per CPU) and then added to the document in order.
+
+    Returns a list of `(table, seconds)` pairs with the tables that were added
+    and the time it took to build each of them.
+    """
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+
+    specs = list(specs)
+    # The (empty) tables and their captions are added to the document first,
+    # so that they are in the right order and the workers know the column widths
+    tables = []
+    for spec in specs:
+        if spec.caption is not None:
+            style = 'Caption' if 'Caption' in document.styles else None
+            document.add_paragraph(spec.caption, style=style)
+        tables.append(document.add_table(rows=0, cols=spec.nr_of_columns()))
+
+    results = []
+    work = [(spec, _table_widths(table)) for (spec, table) in zip(specs, tables)]
+    with multiprocessing.Pool(processes) as pool:
+        for (table, (xml, seconds)) in zip(tables, pool.imap(_build_table_xml, work)):
+            rows = parse_xml(b'<w:tbl ' + nsdecls('w').encode('utf-8') + b'>' + xml + b'</w:tbl>')
+            table._tbl.extend(list(rows))
+            results.append((table, seconds))
+
+    return results
+
+
+def _format_chunk(chunk, columns, formatters, converters=dict()):
+    # Dataframes are formatted column by column, other chunks are sequences of rows
+    if hasattr(chunk, 'columns'):
+        values = [_column_values(chunk[column]) for column in columns]
+    else:
+        rows = list(chunk)
+        values = list(zip(*rows)) if rows else [[] for _column in columns]
+
+    formatted_columns = []
+    for (column, column_values) in zip(columns, values):
+        with instrumentation.timer('docx.format_column.{}'.format(column)):
+            converter = converters.get(column)
+            if converter is not None:
+                column_values = [converter(value) for value in column_values]
             formatter = formatters.get(column, DefaultFormatter())
-            # Extract the value from the table
-            value = dataframe[column][row]
-            # Get the paragraphs from the table cell
-            # (there may be more than one!)
-            paragraphs = table.cell(row + 1, i).paragraphs
-            formatter.insert(paragraph, value)
\ No newline at end of file
+            formatted_columns.append(formatter.format_column(column_values))
+    return list(zip(*formatted_columns))
+
+
+def write_table_stream(path, chunks, columns=None, formatters=dict(), document=None, converters=dict()):
+    """
+    Write a .docx file with a table whose rows come from an iterator of chunks.
+
+    The chunks can be pandas dataframes (for example, from `pandas.read_csv(..., chunksize=...)`)
+    or sequences of rows (for example, from a CSV reader or a generator).
+    In the second case the names of the `columns` must be given.
+
+    `converters` maps column names to functions which are applied to each value
+    before it is formatted. Rows from a CSV reader contain strings, so numeric
+    columns need a converter, such as `float`:
+
+        reader = csv.reader(f)
+        columns = next(reader)
+        chunks = iter(lambda: list(itertools.islice(reader, 10000)), [])
+        write_table_stream(path, chunks, columns, formatters={'p': TruncatedPValueFormatter()},
+                           converters={'N': int, 'p': float})
+
+    The chunks are formatted and written to the file one at a time,
+    so only one chunk needs to be kept in memory.
+
+    The table is appended to a copy of `document` (the styled document by default).
+    Returns the number of rows written, not counting the header.
+    """
+    from lxml import etree
+
+    chunks = iter(chunks)
+    first_chunk = next(chunks, None)
+    if columns is None:
+        if first_chunk is None or not hasattr(first_chunk, 'columns'):
+            raise ValueError("the columns must be given if the chunks aren't dataframes")
+        columns = list(first_chunk.columns)
+    if first_chunk is not None:
+        chunks = itertools.chain([first_chunk], chunks)
+
+    document = copy.deepcopy(document) if document is not None else new_styled_document()
+    table = document.add_table(rows=0, cols=len(columns))
+    tbl = table._tbl
+    builder = _TableXmlBuilder([gridCol.w for gridCol in tbl.tblGrid.gridCol_lst])
+    tbl.append(builder.row([[(str(column), 'bold')] for column in columns]))
+    # The rows will be written in place of this comment
+    marker = 'playfair-table-rows'
+    tbl.append(etree.Comment(marker))
+
+    template = io.BytesIO()
+    document.save(template)
+
+    partname = document.part.partname.lstrip('/')
+    nr_of_rows = 0
+    with zipfile.ZipFile(template) as template_zip, \
+            zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as output_zip:
+        for info in template_zip.infolist():
+            if info.filename != partname:
+                output_zip.writestr(info.filename, template_zip.read(info.filename))
+                continue
+
+            (prefix, suffix) = template_zip.read(partname).split(('<!--%s-->' % marker).encode('utf-8'))
+            with output_zip.open(partname, 'w', force_zip64=True) as stream:
+                stream.write(prefix)
+                for chunk in chunks:
+                    rows = _format_chunk(chunk, columns, formatters, converters)
+                    stream.write(builder.rows_xml(rows))
+                    nr_of_rows += len(rows)
+                stream.write(suffix)
+
+    return nr_of_rows
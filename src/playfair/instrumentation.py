@@ -0,0 +1,154 @@
+"""
+Opt-in counters and timings for the slow parts of playfair.
+
+Instrumentation is off by default, and then it costs (almost) nothing.
+Turn it on for a block of code with `instrument()`:
+
+    with instrument() as recorder:
+        add_comparisons_to_axes(ax, comparisons)
+    print(recorder.summary())
+
+or for the whole process by setting the environment variable
+`PLAYFAIR_INSTRUMENT=1`, in which case the summary is reported
+when the process exits.
+
+Summaries are given to the hooks registered with `add_hook()`,
+which can feed them to a metrics system. If the environment variable
+is set and there are no hooks, the summary is written to stderr as JSON.
+
+Nothing in this module depends on matplotlib or python-docx.
+"""
+import atexit
+import collections
+import contextlib
+import json
+import os
+import sys
+import time
+
+ENV_VAR = 'PLAYFAIR_INSTRUMENT'
+
+
+class Recorder(object):
+    """
+    Counters, timings and maximum values, by name.
+    """
+
+    def __init__(self):
+        self.counters = collections.Counter()
+        # Number of calls, total and maximum time for each timing
+        self.timings = dict()
+        self.maxima = dict()
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def time(self, name, seconds):
+        timing = self.timings.get(name)
+        if timing is None:
+            self.timings[name] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def maximum(self, name, value):
+        if name not in self.maxima or value > self.maxima[name]:
+            self.maxima[name] = value
+
+    def summary(self):
+        """
+        Return everything that was recorded as a dict of plain python values
+        (which can be serialized as JSON).
+        """
+        return {
+            'counters': dict(self.counters),
+            'timings': dict((name, {'calls': calls, 'total': total, 'max': maximum})
+                            for (name, (calls, total, maximum)) in self.timings.items()),
+            'maxima': dict(self.maxima)
+        }
+
+
+class _Timer(object):
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+# The recorder in use, or None if instrumentation is off
+_recorder = None
+_hooks = []
+_null_timer = contextlib.nullcontext()
+
+def active():
+    """
+    Return the recorder in use, or None if instrumentation is off.
+    """
+    return _recorder
+
+def count(name, n=1):
+    if _recorder is not None:
+        _recorder.count(name, n)
+
+def maximum(name, value):
+    if _recorder is not None:
+        _recorder.maximum(name, value)
+
+def timer(name):
+    """
+    A context manager which records how long its block takes to run.
+    """
+    if _recorder is None:
+        return _null_timer
+    return _Timer(_recorder, name)
+
+def add_hook(hook):
+    """
+    Register a function to be called with the summary (see `Recorder.summary()`)
+    at the end of each `instrument()` block.
+    """
+    _hooks.append(hook)
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+def _report(summary):
+    for hook in list(_hooks):
+        hook(summary)
+
+@contextlib.contextmanager
+def instrument():
+    """
+    Record counters and timings for the code in the block.
+
+    Yields the `Recorder`. Nested blocks record their own data separately.
+    """
+    global _recorder
+    previous = _recorder
+    recorder = Recorder()
+    _recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _recorder = previous
+        _report(recorder.summary())
+
+def _report_at_exit(recorder):
+    summary = recorder.summary()
+    if _hooks:
+        _report(summary)
+    else:
+        sys.stderr.write(json.dumps(summary, indent=2, sort_keys=True) + '\n')
+
+
+if os.environ.get(ENV_VAR, '') not in ('', '0'):
+    _recorder = Recorder()
+    atexit.register(_report_at_exit, _recorder)
@@ -0,0 +1,624 @@
+"""
+Layout of comparison markers.
+
+Nothing in this module depends on matplotlib.
+"""
+import bisect
+import collections
+import hashlib
+import heapq
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+_MIN = -1e20
+
+class LayerStack(object):
+    """
+    The heights and number of layers of stacked comparison markers.
+
+    Positions can be any numbers (not only integers), which is useful
+    for dodged or grouped boxplots. They are mapped into consecutive slots,
+    so that a marker between `pos1` and `pos2` covers all the positions
+    used by other markers which are between `pos1` and `pos2`.
+
+    The heights and numbers of layers are kept in a segment tree over
+    the slots, which supports range maximum queries and range assignment
+    in O(log(n)) time. They are always assigned to the same slots, so both
+    of them are kept in the same tree, which is stored in arrays and walked
+    iteratively (bottom-up), because recursion is slow in Python.
+
+    If `track_markers` is true, the stack also records which markers each
+    new marker rests on, in `supports` (see `place()`).
+    """
+
+    def __init__(self, positions, track_markers=False):
+        self.positions = sorted(set(positions))
+        self._slots = dict((pos, i) for (i, pos) in enumerate(self.positions))
+        self._tree_height = max(len(self.positions) - 1, 0).bit_length()
+        # The leaves are the nodes [_leaves, 2 * _leaves)
+        self._leaves = 1 << self._tree_height
+        self._heights = [_MIN] * (2 * self._leaves)
+        self._nr_of_layers = [0] * (2 * self._leaves)
+        # Pending (height, nr_of_layers) assignments which haven't been pushed to the children yet
+        self._pending = [None] * self._leaves
+
+        self.supports = [] if track_markers else None
+        if track_markers:
+            # The top marker over the slots, as runs of consecutive slots
+            # (the first slot of each run and the index of its marker, or -1).
+            # Each marker replaces the runs it covers, so there are few of them
+            self._run_starts = [0]
+            self._run_markers = [-1]
+
+    def _range(self, pos1, pos2):
+        slot1 = self._slots[pos1]
+        slot2 = self._slots[pos2]
+        return (min(slot1, slot2), max(slot1, slot2))
+
+    def _push_paths(self, lo, hi):
+        # Push the pending assignments on the paths from the root
+        # to the leaves `lo` and `hi`, so that the nodes next to those paths
+        # (which make up the range between them) are up to date
+        heights = self._heights
+        nr_of_layers = self._nr_of_layers
+        pending = self._pending
+        leaves = self._leaves
+        for shift in range(self._tree_height, 0, -1):
+            node = lo >> shift
+            values = pending[node]
+            if values is not None:
+                child = 2 * node
+                (heights[child], nr_of_layers[child]) = (heights[child + 1], nr_of_layers[child + 1]) = values
+                if child < leaves:
+                    pending[child] = pending[child + 1] = values
+                pending[node] = None
+            node = hi >> shift
+            values = pending[node]
+            if values is not None:
+                child = 2 * node
+                (heights[child], nr_of_layers[child]) = (heights[child + 1], nr_of_layers[child + 1]) = values
+                if child < leaves:
+                    pending[child] = pending[child + 1] = values
+                pending[node] = None
+
+    def _query(self, lo, hi):
+        # The heights and numbers of layers of the leaves `lo` and `hi`
+        # and their maxima between them (the paths must have been pushed)
+        heights = self._heights
+        nr_of_layers = self._nr_of_layers
+        (max_height, max_layers) = (heights[lo], nr_of_layers[lo])
+        (node_lo, node_hi) = (lo, hi + 1)
+        while node_lo < node_hi:
+            if node_lo & 1:
+                if heights[node_lo] > max_height:
+                    max_height = heights[node_lo]
+                if nr_of_layers[node_lo] > max_layers:
+                    max_layers = nr_of_layers[node_lo]
+                node_lo += 1
+            if node_hi & 1:
+                node_hi -= 1
+                if heights[node_hi] > max_height:
+                    max_height = heights[node_hi]
+                if nr_of_layers[node_hi] > max_layers:
+                    max_layers = nr_of_layers[node_hi]
+            node_lo >>= 1
+            node_hi >>= 1
+        return (heights[lo], heights[hi], max_height, nr_of_layers[lo], nr_of_layers[hi], max_layers)
+
+    def _assign(self, lo, hi, height, layers):
+        # Assign to the leaves between `lo` and `hi` (the paths must have been pushed)
+        heights = self._heights
+        nr_of_layers = self._nr_of_layers
+        pending = self._pending
+        leaves = self._leaves
+        values = (height, layers)
+
+        (node_lo, node_hi) = (lo, hi + 1)
+        while node_lo < node_hi:
+            if node_lo & 1:
+                heights[node_lo] = height
+                nr_of_layers[node_lo] = layers
+                if node_lo < leaves:
+                    pending[node_lo] = values
+                node_lo += 1
+            if node_hi & 1:
+                node_hi -= 1
+                heights[node_hi] = height
+                nr_of_layers[node_hi] = layers
+                if node_hi < leaves:
+                    pending[node_hi] = values
+            node_lo >>= 1
+            node_hi >>= 1
+
+        # Pending values on the paths come from this assignment
+        for shift in range(1, self._tree_height + 1):
+            (node_lo, node_hi) = (lo >> shift, hi >> shift)
+            for node in ((node_lo, node_hi) if node_lo != node_hi else (node_lo,)):
+                values = pending[node]
+                if values is None:
+                    child = 2 * node
+                    (left, right) = (heights[child], heights[child + 1])
+                    heights[node] = left if left > right else right
+                    (left, right) = (nr_of_layers[child], nr_of_layers[child + 1])
+                    nr_of_layers[node] = left if left > right else right
+                else:
+                    (heights[node], nr_of_layers[node]) = values
+
+    def _query_slots(self, lo, hi):
+        (lo, hi) = (lo + self._leaves, hi + self._leaves)
+        self._push_paths(lo, hi)
+        return self._query(lo, hi)
+
+    def height(self, pos):
+        slot = self._slots[pos]
+        return self._query_slots(slot, slot)[0]
+
+    def max_height(self, pos1, pos2):
+        return self._query_slots(*self._range(pos1, pos2))[2]
+
+    def nr_of_layers(self, pos):
+        slot = self._slots[pos]
+        return self._query_slots(slot, slot)[3]
+
+    def max_nr_of_layers(self, pos1, pos2):
+        return self._query_slots(*self._range(pos1, pos2))[5]
+
+    def push(self, pos1, pos2, height):
+        """
+        Stack a new marker of the given `height` between `pos1` and `pos2`.
+        """
+        (lo, hi) = self._range(pos1, pos2)
+        (lo, hi) = (lo + self._leaves, hi + self._leaves)
+        self._push_paths(lo, hi)
+        # The new marker must be above all the markers it envelops
+        max_layers = self._query(lo, hi)[5]
+        self._assign(lo, hi, height, max_layers + 1)
+        if self.supports is not None:
+            self._track(self._slots[pos1], self._slots[pos2])
+
+    def _track(self, slot1, slot2):
+        (lo, hi) = (slot1, slot2) if slot1 <= slot2 else (slot2, slot1)
+        starts = self._run_starts
+        markers = self._run_markers
+        first = bisect.bisect_right(starts, lo) - 1
+        last = bisect.bisect_right(starts, hi) - 1
+        end = starts[last + 1] if last + 1 < len(starts) else len(self.positions)
+
+        # The markers under both ends and under the whole marker
+        (marker_lo, marker_hi) = (markers[first], markers[last])
+        if slot1 <= slot2:
+            self.supports.append((marker_lo, marker_hi, markers[first:last + 1]))
+        else:
+            self.supports.append((marker_hi, marker_lo, markers[first:last + 1]))
+
+        # The runs which are only partly covered keep the rest of their slots
+        new_starts = [lo]
+        new_markers = [len(self.supports) - 1]
+        if starts[first] < lo:
+            new_starts.insert(0, starts[first])
+            new_markers.insert(0, marker_lo)
+        if end > hi + 1:
+            new_starts.append(hi + 1)
+            new_markers.append(marker_hi)
+        starts[first:last + 1] = new_starts
+        markers[first:last + 1] = new_markers
+
+    def top_markers(self):
+        """
+        Return the index of the top marker over each position covered
+        by at least one marker, as a dict (only if `track_markers` is true).
+        """
+        top = dict()
+        bounds = self._run_starts + [len(self.positions)]
+        for (start, end, marker) in zip(bounds[:-1], bounds[1:], self._run_markers):
+            if marker >= 0:
+                for pos in self.positions[start:end]:
+                    top[pos] = marker
+        return top
+
+    def place(self, pos1, pos2, top1, top2):
+        """
+        Stack a new marker between `pos1` and `pos2`, above the tops
+        of the groups (`top1` and `top2`) and the markers below it.
+
+        Returns the heights and number of layers at `pos1` and `pos2`
+        and their maxima between `pos1` and `pos2`, before the marker
+        was stacked: `(height1, height2, max_height, layers1, layers2, max_layers)`.
+        This is the same as calling `height()`, `max_height()`, `nr_of_layers()`,
+        `max_nr_of_layers()` and `push()`, but walks the tree only twice.
+
+        If the stack tracks markers, `(marker1, marker2, markers)` is appended
+        to `supports`: the indices of the top markers at `pos1` and at `pos2`
+        and of all the top markers between them (in the order in which they
+        were stacked, -1 for none) on which the new marker rests.
+        """
+        (slot1, slot2) = (self._slots[pos1], self._slots[pos2])
+        swapped = slot1 > slot2
+        (lo, hi) = (slot2, slot1) if swapped else (slot1, slot2)
+        (lo, hi) = (lo + self._leaves, hi + self._leaves)
+        self._push_paths(lo, hi)
+        (height_lo, height_hi, max_height, layers_lo, layers_hi, max_layers) = self._query(lo, hi)
+        self._assign(lo, hi, max(top1, top2, height_lo, height_hi, max_height), max_layers + 1)
+        if self.supports is not None:
+            self._track(slot1, slot2)
+
+        if swapped:
+            return (height_hi, height_lo, max_height, layers_hi, layers_lo, max_layers)
+        return (height_lo, height_hi, max_height, layers_lo, layers_hi, max_layers)
+
+    def as_dicts(self):
+        """
+        Return the heights and number of layers as dicts keyed by position.
+
+        Only the positions covered by at least one marker are included.
+        """
+        heights = dict()
+        nr_of_layers = dict()
+        for (i, pos) in enumerate(self.positions):
+            (height, _height, _max_height, layers, _layers, _max_layers) = self._query_slots(i, i)
+            if layers > 0:
+                heights[pos] = height
+                nr_of_layers[pos] = layers
+
+        return (heights, nr_of_layers)
+
+
+# 1pt = 1/72 inches
+_PT = 1.0/72
+
+class ComparisonLayout(object):
+    """
+    The placement of `n` comparison markers, as NumPy arrays.
+
+    Each marker is made of five segments (s1-s5): the left and right
+    vertical segments (s1 and s5) start at the top of the groups,
+    s3 is the horizontal segment, and s2 and s4 join them.
+    The vertices are given in data coordinates, plus a vertical offset
+    in inches (which doesn't depend on the scale of the axes).
+
+    - `max_left`, `max_right`, `max_all`: the y-coordinates of the bottom
+      of s1 and s5 and of s3, shape `(n,)`
+    - `offset_left`, `offset_right`, `offset_middle`, `offset_text`:
+      the offsets of the bottom of s1 and s5, of s3 and of the label, shape `(n,)`
+    - `segments`: the vertices of s1-s5, shape `(n, 5, 2, 2)`
+    - `offsets`: the offset of each vertex, shape `(n, 5, 2)`
+    - `text_anchors`: the anchor of each label (before the offset), shape `(n, 2)`
+    - `stack`: the `LayerStack` with all the markers
+      (None for layouts from `comparison_layouts()`)
+    """
+
+    def __init__(self, pos1, pos2, max_left, max_right, max_all,
+                 offset_left, offset_right, offset_middle, offset_text, stack, dicts=None):
+        self.max_left = max_left
+        self.max_right = max_right
+        self.max_all = max_all
+        self.offset_left = offset_left
+        self.offset_right = offset_right
+        self.offset_middle = offset_middle
+        self.offset_text = offset_text
+        self.stack = stack
+        self._dicts = dicts
+
+        x1 = np.broadcast_to(pos1, max_all.shape).astype(float)
+        x2 = np.broadcast_to(pos2, max_all.shape).astype(float)
+        self.segments = np.stack([
+            np.stack([np.stack([x1, max_left], -1), np.stack([x1, max_all], -1)], 1),
+            np.stack([np.stack([x1, max_all], -1), np.stack([x1, max_all], -1)], 1),
+            np.stack([np.stack([x1, max_all], -1), np.stack([x2, max_all], -1)], 1),
+            np.stack([np.stack([x2, max_all], -1), np.stack([x2, max_all], -1)], 1),
+            np.stack([np.stack([x2, max_right], -1), np.stack([x2, max_all], -1)], 1)
+        ], 1).reshape(-1, 5, 2, 2)
+        self.offsets = np.stack([
+            np.stack([offset_left, offset_left], -1),
+            np.stack([offset_left, offset_middle], -1),
+            np.stack([offset_middle, offset_middle], -1),
+            np.stack([offset_right, offset_middle], -1),
+            np.stack([offset_right, offset_right], -1)
+        ], 1).reshape(-1, 5, 2)
+        self.text_anchors = np.stack([(x1 + x2)/2, max_all], -1).reshape(-1, 2)
+
+    def __len__(self):
+        return len(self.max_all)
+
+    def as_dicts(self):
+        """
+        Return the heights and number of layers as dicts keyed by position
+        (see `LayerStack.as_dicts()`).
+        """
+        if self.stack is not None:
+            return self.stack.as_dicts()
+        return self._dicts
+
+    def geometry(self, i):
+        """
+        The placement of the `i`-th marker, as a tuple of floats:
+        `(max_left, max_right, max_all, offset_left, offset_right, offset_middle, offset_text)`
+        """
+        return tuple(float(array[i]) for array in [
+            self.max_left, self.max_right, self.max_all,
+            self.offset_left, self.offset_right, self.offset_middle, self.offset_text
+        ])
+
+
+def comparison_layout(pos1, pos2, top1, top2, font_size=10.0, stack=None):
+    """
+    Place comparison markers between the positions `pos1` and `pos2`
+    above the tops of the groups `top1` and `top2` (all of them arrays).
+
+    Markers are stacked in order, each one above the markers that were
+    placed before it and which it overlaps. The padding between markers
+    (in inches) is proportional to the `font_size` (in points).
+    To stack the markers above other markers, give a `LayerStack`
+    which already contains them (and all the positions).
+
+    Returns a `ComparisonLayout`.
+    """
+    pos1 = np.atleast_1d(np.asarray(pos1))
+    pos2 = np.atleast_1d(np.asarray(pos2))
+    top1 = np.atleast_1d(np.asarray(top1, dtype=float))
+    top2 = np.atleast_1d(np.asarray(top2, dtype=float))
+    if stack is None:
+        stack = LayerStack(pos1.tolist() + pos2.tolist())
+
+    # Stacking is sequential, because each marker depends
+    # on the ones before it, but everything else is vectorized
+    # The horizontal segment must be above all the markers between
+    # the two positions, so that the new marker remains above them
+    place = stack.place
+    placed = [place(p1, p2, t1, t2) for (p1, p2, t1, t2) in zip(pos1.tolist(), pos2.tolist(),
+                                                                top1.tolist(), top2.tolist())]
+    (height_left, height_right, height_middle,
+     layers_left, layers_right, layers_middle) = np.array(placed, dtype=float).reshape(-1, 6).T
+
+    max_left = np.maximum(top1, height_left)
+    max_right = np.maximum(top2, height_right)
+    max_all = np.maximum(np.maximum(max_left, max_right), height_middle)
+
+    return ComparisonLayout(pos1, pos2, max_left, max_right, max_all,
+                            *_layer_offsets(layers_left, layers_right, layers_middle, font_size),
+                            stack=stack)
+
+def _layer_offsets(layers_left, layers_right, layers_middle, font_size):
+    delta_y_bottom = (font_size * 1.4) * _PT
+    delta_y_top = (font_size * 1.2) * _PT
+    text_padding_bottom = (font_size * 0.6) * _PT
+    delta_y_total = delta_y_bottom + delta_y_top + text_padding_bottom
+
+    # The number of layers accounts for the data-independent padding
+    # of the markers below
+    offset_left = delta_y_bottom + (delta_y_total * layers_left)
+    offset_right = delta_y_bottom + (delta_y_total * layers_right)
+    offset_bottom_middle = np.maximum(np.maximum(offset_left, offset_right),
+                                      delta_y_bottom + (delta_y_total * layers_middle))
+    offset_middle = offset_bottom_middle + delta_y_top
+    offset_text = offset_middle + text_padding_bottom
+
+    return (offset_left, offset_right, offset_middle, offset_text)
+
+def comparison_layouts(pos1, pos2, top1, top2, font_size=10.0):
+    """
+    Place the same comparison markers (between the positions `pos1` and `pos2`)
+    in many panels, in which the tops of the groups are the rows of `top1` and `top2`
+    (arrays of shape `(nr_of_panels, n)`).
+
+    Which markers each marker is stacked on, and the number of layers,
+    only depend on the positions, so they are worked out only once.
+    The heights of the markers in each panel are then computed from them.
+
+    Returns a `ComparisonLayout` for each panel, the same as `comparison_layout()`.
+    """
+    pos1 = np.atleast_1d(np.asarray(pos1))
+    pos2 = np.atleast_1d(np.asarray(pos2))
+    top1 = np.atleast_2d(np.asarray(top1, dtype=float))
+    top2 = np.atleast_2d(np.asarray(top2, dtype=float))
+    (nr_of_panels, n) = top1.shape
+
+    if nr_of_panels == 1:
+        return [comparison_layout(pos1, pos2, top1[0], top2[0], font_size=font_size)]
+
+    # The numbers of layers and the markers each marker rests on
+    # don't depend on the tops of the groups
+    stack = LayerStack(pos1.tolist() + pos2.tolist(), track_markers=True)
+    place = stack.place
+    placed = [place(p1, p2, 0.0, 0.0) for (p1, p2) in zip(pos1.tolist(), pos2.tolist())]
+    (layers_left, layers_right, layers_middle) = np.array(placed, dtype=float).reshape(-1, 6)[:, 3:].T
+
+    # The heights of the markers are computed panel by panel, with python floats
+    # (which is faster than a numpy call for each marker, because there are few markers below each one).
+    # The height of "no marker" (index -1) is the last one
+    supports = stack.supports
+    height_middle = np.empty((nr_of_panels, n))
+    max_all = np.empty((nr_of_panels, n + 1))
+    for (panel, tops) in enumerate(np.maximum(top1, top2).tolist()):
+        heights = tops + [_MIN]
+        middle = []
+        for (i, (_marker1, _marker2, below)) in enumerate(supports):
+            # The markers at both ends are among the ones below
+            height = max([heights[marker] for marker in below])
+            middle.append(height)
+            if height > tops[i]:
+                heights[i] = height
+        height_middle[panel] = middle
+        max_all[panel] = heights
+
+    markers1 = np.array([marker1 for (marker1, _marker2, _below) in supports], dtype=int)
+    markers2 = np.array([marker2 for (_marker1, marker2, _below) in supports], dtype=int)
+    (height_left, height_right) = (max_all[:, markers1], max_all[:, markers2])
+
+    offsets = _layer_offsets(layers_left, layers_right, layers_middle, font_size)
+    covered = list(stack.top_markers().items())
+    (_heights, nr_of_layers) = stack.as_dicts()
+
+    layouts = []
+    for panel in range(nr_of_panels):
+        max_left = np.maximum(top1[panel], height_left[panel])
+        max_right = np.maximum(top2[panel], height_right[panel])
+        heights = dict((pos, float(max_all[panel, marker])) for (pos, marker) in covered)
+        layouts.append(ComparisonLayout(pos1, pos2, max_left, max_right, max_all[panel, :n],
+                                        *offsets, stack=None, dicts=(heights, nr_of_layers)))
+
+    return layouts
+
+
+def packing_order(pos1, pos2):
+    """
+    An order in which to stack comparison markers (between the positions
+    `pos1` and `pos2`) so that they take as few layers as possible.
+
+    The markers are coloured greedily, in order of their left end,
+    so that markers of the same colour don't overlap (markers which share
+    a position overlap). This uses as many colours as the largest number
+    of markers which overlap at a single position, and those markers
+    must all be in different layers. Stacking the markers one colour
+    at a time uses at most one layer per colour, so it's optimal.
+
+    Returns the indices of the markers in that order. Runs in O(n log(n)).
+    """
+    lefts = [min(p1, p2) for (p1, p2) in zip(pos1, pos2)]
+    rights = [max(p1, p2) for (p1, p2) in zip(pos1, pos2)]
+    by_left = sorted(range(len(lefts)), key=lambda i: (lefts[i], rights[i]))
+
+    colours = [0] * len(lefts)
+    nr_of_colours = 0
+    # The right ends and colours of the markers that may still overlap the next ones,
+    # and the colours which can be used again
+    active = []
+    free = []
+    for i in by_left:
+        while active and active[0][0] < lefts[i]:
+            (_right, colour) = heapq.heappop(active)
+            heapq.heappush(free, colour)
+        if free:
+            colour = heapq.heappop(free)
+        else:
+            colour = nr_of_colours
+            nr_of_colours += 1
+        colours[i] = colour
+        heapq.heappush(active, (rights[i], colour))
+
+    return sorted(by_left, key=lambda i: colours[i])
+
+
+def layout_key(pos1, pos2, top1, top2, font_size=10.0):
+    """
+    A hash of everything a comparison layout depends on.
+
+    The layout doesn't depend on the DPI or on the size of the figure,
+    because the padding between the markers is given in inches.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(float(font_size)).encode('utf-8'))
+    for values in [pos1, pos2, top1, top2]:
+        values = np.ascontiguousarray(np.atleast_1d(np.asarray(values, dtype=float)))
+        digest.update(str(len(values)).encode('utf-8'))
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+LayoutCacheInfo = collections.namedtuple('LayoutCacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+class LayoutCache(object):
+    """
+    A cache for comparison layouts, keyed by a hash of the positions,
+    the tops of the groups and the font size (see `layout_key()`).
+
+    Layouts are kept in memory in a bounded LRU cache of `maxsize` layouts.
+    If a `directory` is given, they are also saved there (as pickles, so only
+    use a directory you trust) and can be shared between processes and runs.
+    When the files take more than `max_bytes`, the least recently used ones
+    are removed.
+
+    Layouts from the cache are shared, so they must not be modified.
+    """
+
+    def __init__(self, maxsize=256, directory=None, max_bytes=64 * 2**20):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._layouts = collections.OrderedDict()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def layout(self, pos1, pos2, top1, top2, font_size=10.0):
+        """
+        Return the same as `comparison_layout()`, from the cache if possible.
+        """
+        key = layout_key(pos1, pos2, top1, top2, font_size)
+        layout = self._layouts.get(key)
+        if layout is not None:
+            self._layouts.move_to_end(key)
+        elif self.directory is not None:
+            layout = self._load(key)
+
+        if layout is None:
+            self.misses += 1
+            layout = comparison_layout(pos1, pos2, top1, top2, font_size)
+            if self.directory is not None:
+                self._save(key, layout)
+        else:
+            self.hits += 1
+
+        self._layouts[key] = layout
+        if len(self._layouts) > self.maxsize:
+            self._layouts.popitem(last=False)
+        return layout
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                layout = pickle.load(f)
+            # The modification time marks when the file was last used
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        return layout
+
+    def _save(self, key, layout):
+        # Write to a temporary file first, so that other processes
+        # never see a partially written file
+        (fd, tmp_path) = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(layout, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+        self._prune()
+
+    def _prune(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pickle'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total = sum(size for (_mtime, size, _path) in files)
+        for (_mtime, size, path) in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def info(self):
+        return LayoutCacheInfo(self.hits, self.misses, self.maxsize, len(self._layouts))
+
+    def clear(self):
+        """
+        Remove all the layouts, from memory and from the directory.
+        """
+        self._layouts.clear()
+        if self.directory is not None:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.pickle'):
+                    os.remove(entry.path)
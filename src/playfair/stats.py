@@ -0,0 +1,253 @@
+"""
+Pairwise significance tests between many groups at once.
+
+The tests between all pairs of groups are computed together
+(instead of calling a test function for each pair) and the results
+can be turned into `Comparison` objects for `add_comparisons_to_axes()`.
+
+Requires scipy (`pip install python-playfair[stats]`),
+which is only imported when the tests are run.
+"""
+import multiprocessing
+
+import numpy as np
+
+STAR_THRESHOLDS = (0.05, 0.01, 0.001, 0.0001)
+
+class PairwiseTests(object):
+    """
+    The results of testing all pairs of groups.
+
+    All attributes are arrays with one element per pair of groups:
+    the indices of the groups (`index1 < index2`), the test statistic,
+    the p-value and the p-value adjusted for multiple comparisons.
+    """
+
+    def __init__(self, index1, index2, statistic, p_values, adjusted_p_values):
+        self.index1 = index1
+        self.index2 = index2
+        self.statistic = statistic
+        self.p_values = p_values
+        self.adjusted_p_values = adjusted_p_values
+
+    def __len__(self):
+        return len(self.index1)
+
+
+def _clean_groups(groups):
+    # NaNs are ignored, as in `group_tops()`
+    cleaned = []
+    for group in groups:
+        group = np.asarray(group, dtype=float).ravel()
+        cleaned.append(group[~np.isnan(group)])
+    return cleaned
+
+def _pairs(nr_of_groups):
+    return np.triu_indices(nr_of_groups, k=1)
+
+def welch_tests(groups):
+    """
+    Welch's t-test between all pairs of groups.
+
+    The mean and variance of each group are computed only once.
+    Returns the indices of the groups in each pair, the t statistics and the p-values.
+    """
+    from scipy.special import stdtr
+
+    groups = _clean_groups(groups)
+    n = np.array([len(group) for group in groups], dtype=float)
+    mean = np.array([group.mean() if len(group) else np.nan for group in groups])
+    var = np.array([group.var(ddof=1) if len(group) > 1 else np.nan for group in groups])
+
+    (index1, index2) = _pairs(len(groups))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Squared standard errors of the means
+        se1 = var[index1] / n[index1]
+        se2 = var[index2] / n[index2]
+        t = (mean[index1] - mean[index2]) / np.sqrt(se1 + se2)
+        df = (se1 + se2) ** 2 / (se1 ** 2 / (n[index1] - 1) + se2 ** 2 / (n[index2] - 1))
+        p_values = 2 * stdtr(df, -np.abs(t))
+
+    return (index1, index2, t, p_values)
+
+
+# The ranks of the values in all groups, shared with the worker processes
+_worker_codes = None
+
+def _init_rank_worker(codes):
+    global _worker_codes
+    _worker_codes = codes
+
+def _rank_block(codes, lo, hi):
+    # The number of times each distinct value in [lo, hi) appears in each group
+    counts = np.zeros((len(codes), hi - lo))
+    below = np.zeros(len(codes))
+    for (i, group_codes) in enumerate(codes):
+        (start, end) = np.searchsorted(group_codes, [lo, hi])
+        below[i] = start
+        counts[i] = np.bincount(group_codes[start:end] - lo, minlength=hi - lo)
+
+    # The number of values in each group smaller than each distinct value
+    smaller = below[:, np.newaxis] + np.cumsum(counts, axis=1) - counts
+    # u[i, j]: number of pairs of values in which the value from group i
+    # is larger than the value from group j (ties count as half)
+    u = counts @ (smaller + 0.5 * counts).T
+    # Needed for the tie correction
+    squares_by_counts = (counts ** 2) @ counts.T
+    cubes = (counts ** 3).sum(axis=1)
+    return (u, squares_by_counts, cubes)
+
+def _rank_block_in_worker(lo_hi):
+    return _rank_block(_worker_codes, *lo_hi)
+
+def mann_whitney_tests(groups, processes=None, block_size=4096):
+    """
+    The Mann-Whitney U test between all pairs of groups
+    (two-sided, with the normal approximation and the tie and continuity corrections).
+
+    All values are ranked together only once. The U statistics for all pairs
+    are then computed with matrix products, in blocks of `block_size` distinct values.
+    If `processes` is given, the blocks are processed in a pool of that many processes.
+
+    Returns the indices of the groups in each pair, the U statistics
+    (of the first group in the pair) and the p-values.
+    """
+    from scipy.special import ndtr
+
+    groups = _clean_groups(groups)
+    (values, codes) = np.unique(np.concatenate(groups + [np.empty(0)]), return_inverse=True)
+    codes = codes.ravel()
+    boundaries = np.cumsum([0] + [len(group) for group in groups])
+    codes = [np.sort(codes[start:end]) for (start, end) in zip(boundaries[:-1], boundaries[1:])]
+
+    nr_of_groups = len(groups)
+    u = np.zeros((nr_of_groups, nr_of_groups))
+    squares_by_counts = np.zeros((nr_of_groups, nr_of_groups))
+    cubes = np.zeros(nr_of_groups)
+    blocks = [(lo, min(lo + block_size, len(values))) for lo in range(0, len(values), block_size)]
+    if processes is None:
+        results = (_rank_block(codes, lo, hi) for (lo, hi) in blocks)
+        for (block_u, block_squares_by_counts, block_cubes) in results:
+            u += block_u
+            squares_by_counts += block_squares_by_counts
+            cubes += block_cubes
+    else:
+        with multiprocessing.Pool(processes, initializer=_init_rank_worker, initargs=(codes,)) as pool:
+            for (block_u, block_squares_by_counts, block_cubes) in pool.imap_unordered(_rank_block_in_worker, blocks):
+                u += block_u
+                squares_by_counts += block_squares_by_counts
+                cubes += block_cubes
+
+    (index1, index2) = _pairs(nr_of_groups)
+    n1 = boundaries[1:][index1] - boundaries[:-1][index1]
+    n2 = boundaries[1:][index2] - boundaries[:-1][index2]
+    n = n1 + n2
+    u1 = u[index1, index2]
+    # The sum of (t**3 - t) for the number t of times each value appears in both groups
+    tie_term = (cubes[index1] + cubes[index2] +
+                3 * squares_by_counts[index1, index2] +
+                3 * squares_by_counts[index2, index1] - n)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mu = n1 * n2 / 2
+        s = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+        z = (np.maximum(u1, n1 * n2 - u1) - mu - 0.5) / s
+        p_values = np.minimum(2 * ndtr(-z), 1.0)
+
+    return (index1, index2, u1, p_values)
+
+def adjust_p_values(p_values, method='holm'):
+    """
+    Adjust p-values for multiple comparisons, with the `'holm'`,
+    `'bonferroni'` or `'bh'` (Benjamini-Hochberg) method, or `None`.
+
+    NaN p-values (from groups which are too small to be tested)
+    stay NaN and don't count as comparisons.
+    """
+    p_values = np.asarray(p_values, dtype=float)
+    if method not in (None, 'holm', 'bonferroni', 'bh'):
+        raise ValueError("unknown correction method: {!r}".format(method))
+
+    result = p_values.copy()
+    tested = ~np.isnan(p_values)
+    p_values = p_values[tested]
+    m = len(p_values)
+    if method is None or m == 0:
+        return result
+    if method == 'bonferroni':
+        result[tested] = np.minimum(p_values * m, 1.0)
+        return result
+
+    order = np.argsort(p_values)
+    sorted_p_values = p_values[order]
+    if method == 'holm':
+        adjusted = np.maximum.accumulate((m - np.arange(m)) * sorted_p_values)
+    else:
+        adjusted = np.minimum.accumulate((m / np.arange(m, 0, -1) * sorted_p_values[::-1]))[::-1]
+
+    adjusted_p_values = np.empty(m)
+    adjusted_p_values[order] = np.minimum(adjusted, 1.0)
+    result[tested] = adjusted_p_values
+    return result
+
+def pairwise_tests(groups, test='welch', correction='holm', processes=None):
+    """
+    Test all pairs of groups with Welch's t-test (`test='welch'`)
+    or the Mann-Whitney U test (`test='mann-whitney'`),
+    and adjust the p-values for multiple comparisons (see `adjust_p_values()`).
+
+    Returns `PairwiseTests`.
+    """
+    if test == 'welch':
+        (index1, index2, statistic, p_values) = welch_tests(groups)
+    elif test == 'mann-whitney':
+        (index1, index2, statistic, p_values) = mann_whitney_tests(groups, processes=processes)
+    else:
+        raise ValueError("unknown test: {!r}".format(test))
+
+    return PairwiseTests(index1, index2, statistic, p_values,
+                         adjust_p_values(p_values, correction))
+
+def stars_label(p_value, thresholds=STAR_THRESHOLDS):
+    """
+    One star for each of the `thresholds` the p-value is below.
+    """
+    from playfair.compare import stars
+    return stars(sum(1 for threshold in thresholds if p_value < threshold))
+
+def p_value_label(p_value, thresholds=STAR_THRESHOLDS):
+    """
+    The smallest of the `thresholds` the p-value is below, as mathtext
+    (for example `'$p < 0.01$'`).
+    """
+    below = [threshold for threshold in thresholds if p_value < threshold]
+    if not below:
+        return '$p = {:.2f}$'.format(p_value)
+    return '$p < {:g}$'.format(min(below))
+
+def significant_comparisons(groups, positions=None, test='welch', correction='holm',
+                            alpha=0.05, label=stars_label, processes=None):
+    """
+    Test all pairs of groups (see `pairwise_tests()`) and return a `Comparison`
+    for each pair with an adjusted p-value below `alpha`.
+
+    `label` is a function that turns the adjusted p-value into the text of
+    the comparison marker (`stars_label` or `p_value_label`, for example).
+    As in `axes.boxplot()`, the default positions are 1, 2, ..., len(groups).
+    The comparisons keep the tops of the groups instead of the groups themselves.
+    """
+    from playfair.compare import Comparison, group_tops
+
+    if positions is None:
+        positions = list(range(1, len(groups) + 1))
+    tops = group_tops(groups, positions)
+    results = pairwise_tests(groups, test=test, correction=correction, processes=processes)
+
+    comparisons = []
+    for (i, j, p_value) in zip(results.index1.tolist(), results.index2.tolist(),
+                               results.adjusted_p_values.tolist()):
+        if p_value < alpha:
+            (pos1, pos2) = (positions[i], positions[j])
+            comparisons.append(Comparison(label(p_value), tops[pos1], tops[pos2], pos1, pos2))
+
+    return comparisons
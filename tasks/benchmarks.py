@@ -0,0 +1,22 @@
+import datetime
+import os
+import subprocess
+import sys
+
+def run_benchmarks(extra_args=()):
+    # Save the results as JSON, named after the current version and date,
+    # so that results from different releases can be compared with
+    # `pytest-benchmark compare benchmarks/results/*.json`
+    from playfair import __version__
+    results_dir = os.path.join('benchmarks', 'results')
+    os.makedirs(results_dir, exist_ok=True)
+    json_path = os.path.join(results_dir, '{}-{}.json'.format(
+        __version__, datetime.date.today().isoformat()))
+
+    command = [sys.executable, '-m', 'pytest', 'benchmarks',
+               '--benchmark-json={}'.format(json_path)] + list(extra_args)
+    return subprocess.call(command)
+
+
+if __name__ == '__main__':
+    sys.exit(run_benchmarks(sys.argv[1:]))
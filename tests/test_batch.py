@@ -0,0 +1,22 @@
+from playfair.batch import FigureSpec, render_figures
+from playfair.compare import Comparison, stars
+import numpy as np
+
+def test_render_figures(tmp_path):
+    d1 = np.linspace(1, 2, 55)
+    d2 = np.linspace(2, 2.5, 34)
+    d3 = np.linspace(1.25, 3, 40)
+    comps = [Comparison(stars(1), d1, d2, 1, 2), Comparison(stars(2), d1, d3, 1, 3)]
+
+    specs = [
+        FigureSpec([d1, d2, d3], comps, str(tmp_path / 'figure.png'), labels=["A", "B", "C"]),
+        FigureSpec([d1, d2, d3], comps, str(tmp_path / 'figure.svg'), size=(4, 3),
+                   options=dict(batched=True, fit_ylim=True)),
+        FigureSpec([d1, d2, d3], comps, str(tmp_path / 'figure'), format='pdf', ylim=(0, 5))
+    ]
+    timings = render_figures(specs, processes=2)
+
+    assert [path for (path, _seconds) in timings] == [spec.path for spec in specs]
+    for (path, seconds) in timings:
+        assert seconds > 0
+        assert (tmp_path / path).stat().st_size > 0
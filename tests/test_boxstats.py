@@ -0,0 +1,72 @@
+from playfair.boxstats import BoxStats, box_stats, boxplot
+from playfair.compare import add_comparisons_to_axes, Comparison, stars
+
+from matplotlib import cbook
+from matplotlib import pyplot as plt
+import numpy as np
+import pytest
+
+def _example_data(size=100000, seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.lognormal(size=size)
+    data[::1000] = np.nan
+    return data
+
+def test_exact_box_stats_are_the_same_as_matplotlib():
+    data = _example_data()
+    [expected] = cbook.boxplot_stats(data[~np.isnan(data)])
+    stats = box_stats(data, method='exact', max_fliers=len(data), chunk_size=999)
+
+    for key in ['mean', 'iqr', 'cilo', 'cihi', 'whislo', 'whishi', 'q1', 'med', 'q3']:
+        assert stats[key] == pytest.approx(expected[key])
+    assert (stats['fliers'] == np.unique(expected['fliers'])).all()
+    assert stats['top'] == np.nanmax(data)
+    assert stats['n'] == (~np.isnan(data)).sum()
+
+def test_sampled_box_stats_are_close():
+    data = _example_data()
+    [expected] = cbook.boxplot_stats(data[~np.isnan(data)])
+    stats = box_stats(iter(np.array_split(data, 37)), sample_size=20000, max_fliers=10, seed=0)
+
+    for key in ['q1', 'med', 'q3']:
+        assert stats[key] == pytest.approx(expected[key], rel=0.05)
+    # These are always exact
+    assert stats['mean'] == pytest.approx(expected['mean'])
+    assert stats['top'] == np.nanmax(data)
+    assert stats['whislo'] == expected['whislo']
+    # The largest value is always shown as an outlier
+    assert stats['fliers'].max() == np.nanmax(data)
+    assert len(stats['fliers']) <= 11
+
+def test_box_stats_of_a_memory_mapped_array(tmp_path):
+    data = _example_data(10000)
+    path = str(tmp_path / 'data.npy')
+    np.save(path, data)
+    mapped = np.load(path, mmap_mode='r')
+    stats = box_stats(mapped, method='exact', chunk_size=1000)
+    expected = box_stats(data, method='exact')
+    for key in ['mean', 'whislo', 'whishi', 'q1', 'med', 'q3', 'top']:
+        assert stats[key] == pytest.approx(expected[key])
+    assert stats['med'] == np.nanmedian(data)
+
+def test_box_stats_need_data():
+    with pytest.raises(ValueError):
+        BoxStats().stats()
+    with pytest.raises(ValueError):
+        BoxStats(method='unknown')
+
+def test_boxplot_and_comparisons_from_summaries():
+    groups = [_example_data(20000, seed) for seed in range(3)]
+    fig, ax = plt.subplots(1)
+    (artists, tops) = boxplot(ax, [iter(np.array_split(group, 4)) for group in groups],
+                              labels=['A', 'B', 'C'], method='exact')
+    assert len(artists['boxes']) == 3
+    assert tops == {1: np.nanmax(groups[0]), 2: np.nanmax(groups[1]), 3: np.nanmax(groups[2])}
+
+    comps = [Comparison(stars(1), tops[1], tops[2], 1, 2), Comparison(stars(2), tops[1], tops[3], 1, 3)]
+    fig2, ax2 = plt.subplots(1)
+    assert add_comparisons_to_axes(ax, comps) == add_comparisons_to_axes(ax2, [
+        Comparison(comp.text, groups[comp.pos1 - 1], groups[comp.pos2 - 1], comp.pos1, comp.pos2)
+        for comp in comps])
+    plt.close(fig)
+    plt.close(fig2)
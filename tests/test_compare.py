@@ -1,5 +1,8 @@
-from playfair.compare import add_comparisons_to_axes, Comparison, stars
+from playfair.compare import add_comparisons_to_axes, Comparison, stars, group_tops, \
+    ComparisonOverlay, comparison_overlay, ComparisonSet, _label_path, add_comparisons_to_figure
+from playfair.layout import LayoutCache
 from matplotlib import pyplot as plt
+import io
 import os
 import numpy as np
 
@@ -25,9 +28,354 @@ def test_example1():
     dir_path = os.path.dirname(os.path.realpath(__file__))
     fig.savefig(os.path.join(dir_path, 'fixtures/output-example-1.png'))
 
+def _example_comparisons():
+    d1 = np.linspace(1, 2, 55)
+    d2 = np.linspace(2, 2.5, 34)
+    d3 = np.linspace(1.25, 3, 40)
+    d4 = np.linspace(3.4, 5.5, 50)
+
+    comp1 = Comparison(stars(1), d1, d2, 1, 2)
+    comp2 = Comparison(stars(2), d3, d4, 3, 4)
+    comp3 = Comparison(stars(3), d3, d4, 2, 3)
+    comp4 = Comparison(stars(4), d2, d4, 2, 4)
+    comp5 = Comparison(stars(5), d1, d3, 1, 3)
+    comp6 = Comparison(stars(6), d1, d4, 1, 4)
+    return ([d1, d2, d3, d4], [comp1, comp2, comp3, comp4, comp5, comp6])
+
+def _render_example(**kwargs):
+    (data, comps) = _example_comparisons()
+    fig, ax = plt.subplots(1)
+    ax.boxplot(data)
+    add_comparisons_to_axes(ax, comps, **kwargs)
+    ax.set_ylim(0, 12)
+    fig.set_size_inches(6, 6)
+    fig.canvas.draw()
+    image = np.array(fig.canvas.buffer_rgba())
+    plt.close(fig)
+    return (ax, image)
+
+def test_batched_comparisons_look_the_same():
+    (_ax, image) = _render_example()
+    (_ax, batched_image) = _render_example(batched=True)
+    assert (image == batched_image).all()
+
+def test_batched_comparisons_create_fewer_artists():
+    (ax, _image) = _render_example()
+    # Five lines and a label for each comparison
+    assert len(ax.__comparison_artists) == 6 * 6
+
+    (ax, _image) = _render_example(batched=True)
+    # A single line collection and a label for each comparison
+    assert len(ax.__comparison_artists) == 1 + 6
+
+def test_comparisons_between_dodged_positions():
+    (data, _comps) = _example_comparisons()
+    positions = [0.8, 1.2, 1.8, 2.2]
+    comps = [
+        Comparison(stars(1), data[0], data[1], 0.8, 1.2),
+        Comparison(stars(2), data[2], data[3], 1.8, 2.2),
+        Comparison(stars(3), data[1], data[2], 1.2, 1.8)
+    ]
+
+    fig, ax = plt.subplots(1)
+    ax.boxplot(data, positions=positions, widths=0.3)
+    (heights, nr_of_layers) = add_comparisons_to_axes(ax, comps)
+    plt.close(fig)
+
+    assert nr_of_layers == {0.8: 1, 1.2: 2, 1.8: 2, 2.2: 1}
+    assert heights[1.2] == heights[1.8] == max(data[3].max(), data[2].max())
+
+def test_comparisons_with_precomputed_tops_are_placed_the_same():
+    (data, comps) = _example_comparisons()
+    fig, ax = plt.subplots(1)
+    expected = add_comparisons_to_axes(ax, comps)
+
+    tops = group_tops(data)
+    assert tops == {1: 2.0, 2: 2.5, 3: 3.0, 4: 5.5}
+    scalar_comps = [Comparison(c.text, tops[c.pos1], tops[c.pos2], c.pos1, c.pos2)
+                    for c in comps]
+    assert add_comparisons_to_axes(ax, scalar_comps) == expected
+    plt.close(fig)
+
+def test_tops_given_by_position_take_precedence_over_the_data():
+    (data, comps) = _example_comparisons()
+    fig, ax = plt.subplots(1)
+    (heights, _nr_of_layers) = add_comparisons_to_axes(ax, comps[:1], tops={1: 10.0, 2: 1.0})
+    plt.close(fig)
+    assert heights == {1: 10.0, 2: 10.0}
+
+def test_group_tops_ignore_nans():
+    assert group_tops([[1.0, np.nan, 3.0]], positions=[0.5]) == {0.5: 3.0}
+
+def _labels_fit_inside_axes(ax):
+    fig = ax.get_figure()
+    fig.canvas.draw()
+    renderer = fig.canvas.get_renderer()
+    axes_bbox = ax.get_window_extent(renderer)
+    return all(text.get_window_extent(renderer).y1 <= axes_bbox.y1 for text in ax.texts)
+
+def test_fit_ylim_makes_the_labels_fit_inside_the_axes():
+    (data, comps) = _example_comparisons()
+    fig, ax = plt.subplots(1)
+    fig.set_size_inches(6, 6)
+    ax.boxplot(data)
+    add_comparisons_to_axes(ax, comps)
+    assert not _labels_fit_inside_axes(ax)
+    plt.close(fig)
+
+    for measure_labels in [False, True]:
+        fig, ax = plt.subplots(1)
+        fig.set_size_inches(6, 6)
+        ax.boxplot(data)
+        add_comparisons_to_axes(ax, comps, fit_ylim=True, measure_labels=measure_labels)
+        assert _labels_fit_inside_axes(ax)
+        plt.close(fig)
+
+def test_fit_ylim_with_measured_mathtext_labels():
+    (data, _comps) = _example_comparisons()
+    comps = [Comparison("$p < 0.01$", data[0], data[1], 1, 2),
+             Comparison("$p < 0.05$", data[0], data[2], 1, 3)]
+    fig, ax = plt.subplots(1)
+    fig.set_size_inches(4, 3)
+    ax.boxplot(data[:3])
+    add_comparisons_to_axes(ax, comps, batched=True, fit_ylim=True, measure_labels=True)
+    assert _labels_fit_inside_axes(ax)
+    plt.close(fig)
+
+def _overlay_example(comps, **kwargs):
+    (data, _comps) = _example_comparisons()
+    fig, ax = plt.subplots(1)
+    fig.set_size_inches(6, 6)
+    ax.boxplot(data)
+    ax.set_ylim(0, 12)
+    overlay = ComparisonOverlay(ax, comps, **kwargs)
+    return (fig, ax, overlay)
+
+def _canvas_image(fig):
+    return np.array(fig.canvas.buffer_rgba())
+
+def test_overlay_looks_like_batched_comparisons():
+    (_data, comps) = _example_comparisons()
+    (_ax, expected) = _render_example(batched=True)
+    for blit in [False, True]:
+        (fig, _ax, _overlay) = _overlay_example(comps, blit=blit)
+        fig.canvas.draw()
+        assert (_canvas_image(fig) == expected).all()
+        plt.close(fig)
+
+def test_overlay_in_debug_mode_looks_like_batched_comparisons():
+    (_data, comps) = _example_comparisons()
+    (_ax, expected) = _render_example(batched=True, debug=True)
+    (fig, _ax, _overlay) = _overlay_example(comps, blit=False, debug=True)
+    fig.canvas.draw()
+    assert (_canvas_image(fig) == expected).all()
+    plt.close(fig)
+
+def test_overlay_add_and_remove_comparisons():
+    (_data, comps) = _example_comparisons()
+    (fig, ax, overlay) = _overlay_example(comps)
+    fig.canvas.draw()
+
+    # Removing a comparison moves the ones stacked above it
+    removed = comps[1]
+    overlay.remove(removed)
+    remaining = [comp for comp in comps if comp is not removed]
+    fig2, ax2 = plt.subplots(1)
+    assert ax.__comparison_data == add_comparisons_to_axes(ax2, remaining)
+    plt.close(fig2)
+    assert len(ax.__comparison_artists) == 1 + len(remaining)
+
+    # The blitted image is the same as drawing everything again
+    blitted = _canvas_image(fig)
+    (fig3, _ax3, _overlay3) = _overlay_example(remaining)
+    fig3.canvas.draw()
+    assert (blitted == _canvas_image(fig3)).all()
+    plt.close(fig3)
+
+    overlay.add(removed)
+    blitted = _canvas_image(fig)
+    fig.canvas.draw()
+    assert (blitted == _canvas_image(fig)).all()
+    plt.close(fig)
+
+def test_overlay_is_included_in_saved_figures():
+    (_data, comps) = _example_comparisons()
+    (fig, _ax, overlay) = _overlay_example(comps)
+    fig.canvas.draw()
+    drawn = _canvas_image(fig)
+
+    output = io.BytesIO()
+    fig.savefig(output, format='png')
+    output.seek(0)
+    saved = plt.imread(output)
+    assert np.allclose(saved, drawn / 255.0)
+
+    overlay.disconnect()
+    assert comparison_overlay(_ax).comparisons == []
+    plt.close(fig)
+
+def test_comparisons_with_a_layout_cache():
+    (data, comps) = _example_comparisons()
+    cache = LayoutCache()
+    results = []
+    for batched in [False, True, True]:
+        fig, ax = plt.subplots(1)
+        ax.boxplot(data)
+        results.append(add_comparisons_to_axes(ax, comps, batched=batched, layout_cache=cache))
+        plt.close(fig)
+
+    assert results[0] == results[1] == results[2]
+    assert cache.info().hits == 2
+
+def test_packed_comparisons_take_fewer_layers():
+    (data, _comps) = _example_comparisons()
+    comps = [Comparison(stars(1), data[i], data[i + 1], i + 1, i + 2) for i in range(3)]
+    fig, ax = plt.subplots(1)
+    ax.boxplot(data)
+    (_heights, nr_of_layers) = add_comparisons_to_axes(ax, comps)
+    (_heights, packed_nr_of_layers) = add_comparisons_to_axes(ax, comps, pack=True)
+    plt.close(fig)
+
+    assert max(nr_of_layers.values()) == 3
+    assert max(packed_nr_of_layers.values()) == 2
+
+def _label_path_extents(ax, labels):
+    # The extents (in display coordinates) of each of the outlines in the collection
+    offsets = labels.get_offset_transform().transform(labels.get_offsets())
+    transform = labels.get_transform()
+    return [transform.transform(path.vertices) + offset
+            for (path, offset) in zip(labels.get_paths(), offsets)]
+
+def test_labels_drawn_as_paths_are_in_the_same_place_as_text():
+    (data, comps) = _example_comparisons()
+    comps.append(Comparison("$p < 0.01$", data[0], data[3], 1, 4))
+    for label_paths in [False, True]:
+        fig, ax = plt.subplots(1)
+        fig.set_size_inches(6, 6)
+        ax.boxplot(data)
+        add_comparisons_to_axes(ax, comps, batched=True, label_paths=label_paths)
+        ax.set_ylim(0, 14)
+        fig.canvas.draw()
+        if label_paths:
+            # The brackets and all the labels
+            assert len(ax.__comparison_artists) == 2
+            path_extents = _label_path_extents(ax, ax.__comparison_artists[1])
+        else:
+            renderer = fig.canvas.get_renderer()
+            text_extents = [text.get_window_extent(renderer) for text in ax.texts]
+        plt.close(fig)
+
+    for (vertices, bbox) in zip(path_extents, text_extents):
+        (x_min, y_min) = vertices.min(axis=0)
+        (x_max, y_max) = vertices.max(axis=0)
+        assert abs((x_min + x_max) / 2 - (bbox.x0 + bbox.x1) / 2) < 1
+        assert bbox.y0 - 1 <= y_min and y_max <= bbox.y1 + 1
+
+def test_label_paths_are_laid_out_once():
+    (data, comps) = _example_comparisons()
+    fig, ax = plt.subplots(1)
+    ax.boxplot(data)
+    add_comparisons_to_axes(ax, comps, label_paths=True)
+    misses = _label_path.cache_info().misses
+    add_comparisons_to_axes(ax, comps, label_paths=True)
+    assert _label_path.cache_info().misses == misses
+    # Five lines for each comparison and all the labels
+    assert len(ax.__comparison_artists) == 5 * len(comps) + 1
+    plt.close(fig)
+
+def test_comparison_has_no_dict():
+    comparison = Comparison(stars(1), 1.0, 2.0, 1, 2)
+    assert not hasattr(comparison, '__dict__')
+
+def test_comparison_set_stores_each_label_once():
+    comparison_set = ComparisonSet.from_texts([1, 1, 2], [2, 3, 3], [1.0, 1.0, 2.0], [2.0, 3.0, 3.0],
+                                              [stars(1), stars(2), stars(1)])
+    assert comparison_set.labels == [stars(1), stars(2)]
+    assert comparison_set.label_indices.tolist() == [0, 1, 0]
+    assert comparison_set.texts() == [stars(1), stars(2), stars(1)]
+    assert len(comparison_set.take([2, 0])) == 2
+    assert comparison_set.take([2, 0]).texts() == [stars(1), stars(1)]
+
+def test_comparison_set_looks_the_same_as_comparisons():
+    (data, comps) = _example_comparisons()
+    comparison_set = ComparisonSet.from_comparisons(comps)
+    assert comparison_set.top1.tolist() == [np.max(comp.data1) for comp in comps]
+
+    for batched in [False, True]:
+        (_ax, expected) = _render_example(batched=batched)
+        fig, ax = plt.subplots(1)
+        ax.boxplot(data)
+        result = add_comparisons_to_axes(ax, comparison_set, batched=batched)
+        ax.set_ylim(0, 12)
+        fig.set_size_inches(6, 6)
+        fig.canvas.draw()
+        assert (np.array(fig.canvas.buffer_rgba()) == expected).all()
+        plt.close(fig)
+
+    fig, ax = plt.subplots(1)
+    assert result == add_comparisons_to_axes(ax, comps)
+    assert add_comparisons_to_axes(ax, comparison_set, pack=True) == \
+        add_comparisons_to_axes(ax, comps, pack=True)
+    assert add_comparisons_to_axes(ax, comparison_set, tops={1: 10.0}) == \
+        add_comparisons_to_axes(ax, comps, tops={1: 10.0})
+    plt.close(fig)
+
+def _figure_example(sharey=False):
+    (data, comps) = _example_comparisons()
+    fig, axs = plt.subplots(2, 2, sharey=sharey)
+    fig.set_size_inches(8, 8)
+    panels = []
+    for (i, ax) in enumerate(axs.ravel()):
+        panel_data = [group * (1 + i) for group in data]
+        ax.boxplot(panel_data)
+        # The last panel has a different structure from the others
+        panel_comps = comps if i < 3 else comps[:-1]
+        panels.append((ax, [Comparison(comp.text, panel_data[comp.pos1 - 1], panel_data[comp.pos2 - 1],
+                                       comp.pos1, comp.pos2) for comp in panel_comps]))
+    return (fig, panels)
+
+def test_figure_comparisons_are_the_same_as_comparisons_by_axes():
+    (fig, panels) = _figure_example()
+    expected = [add_comparisons_to_axes(ax, comps, batched=True) for (ax, comps) in panels]
+    fig.canvas.draw()
+    expected_image = _canvas_image(fig).copy()
+    plt.close(fig)
 
+    (fig, panels) = _figure_example()
+    results = add_comparisons_to_figure(fig, dict(panels))
+    fig.canvas.draw()
+    assert [results[ax] for (ax, _comps) in panels] == expected
+    assert np.array_equal(_canvas_image(fig), expected_image)
+    plt.close(fig)
 
+def test_figure_comparisons_by_axes_index():
+    (fig, panels) = _figure_example()
+    results = add_comparisons_to_figure(fig, [(i, comps) for (i, (_ax, comps)) in enumerate(panels)])
+    assert set(results) == set(ax for (ax, _comps) in panels)
+    plt.close(fig)
 
+def test_figure_comparisons_with_a_layout_cache():
+    cache = LayoutCache()
+    results = []
+    for _ in range(2):
+        (fig, panels) = _figure_example()
+        result = add_comparisons_to_figure(fig, panels, layout_cache=cache)
+        results.append([result[ax] for (ax, _comps) in panels])
+        plt.close(fig)
 
+    assert results[0] == results[1]
+    assert cache.info().hits == len(panels)
 
+def test_figure_fit_ylim_is_the_same_for_shared_axes():
+    (fig, panels) = _figure_example(sharey=True)
+    add_comparisons_to_figure(fig, panels, fit_ylim=True)
+    ylims = set(ax.get_ylim() for (ax, _comps) in panels)
+    assert len(ylims) == 1
+    assert all(_labels_fit_inside_axes(ax) for (ax, _comps) in panels)
+    plt.close(fig)
 
+    (fig, panels) = _figure_example(sharey=False)
+    add_comparisons_to_figure(fig, panels, fit_ylim=True)
+    assert len(set(ax.get_ylim() for (ax, _comps) in panels)) == 4
+    assert all(_labels_fit_inside_axes(ax) for (ax, _comps) in panels)
+    plt.close(fig)
@@ -1,6 +1,29 @@
 from playfair.docx import *
 
 from docx import Document
+import os
 
 def test_can_get_new_styled_document():
     new_styled_document()
+
+def test_styled_documents_are_independent():
+    document1 = new_styled_document()
+    document2 = new_styled_document()
+    document1.add_paragraph("Only in the first document")
+    assert len(document1.paragraphs) == len(document2.paragraphs) + 1
+
+def test_registered_templates_are_reloaded_when_the_file_changes(tmp_path):
+    path = str(tmp_path / 'template.docx')
+    template = Document()
+    template.add_paragraph("Version 1")
+    template.save(path)
+
+    register_template('test-template', path)
+    assert new_document_from_template('test-template').paragraphs[0].text == "Version 1"
+
+    template.paragraphs[0].text = "Version 2"
+    template.save(path)
+    # Make sure the modification time changes even on filesystems with a coarse resolution
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert new_document_from_template('test-template').paragraphs[0].text == "Version 2"
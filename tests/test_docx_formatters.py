@@ -2,7 +2,10 @@ from playfair.docx import *
 
 from docx import Document
 from hypothesis import given
-from hypothesis.strategies import floats, integers
+from hypothesis.strategies import floats, integers, lists
+import numpy as np
+import datetime
+from decimal import Decimal
 
 def test_can_get_new_styled_document():
     new_styled_document()
@@ -265,3 +268,107 @@ def test_truncated_p_value_formatter_both_ends_upper(a, b, c):
         # to parse it as a float
         if number_part not in ['+∞', '-∞', 'NaN']:
             float(number_part)
+
+
+def _runs_one_at_a_time(formatter, values):
+    return [formatter.runs(value) for value in values]
+
+@given(lists(floats()), integers(min_value=0, max_value=6))
+def test_format_column_is_the_same_as_formatting_each_value(values, nr_of_places):
+    array = np.array(values, dtype=float)
+    for formatter in [IntegerFormatter(),
+                      DefaultFormatter(),
+                      RoundedFormatter(nr_of_places),
+                      TruncatedPValueFormatter(nr_of_places=nr_of_places)]:
+        assert formatter.format_column(array) == _runs_one_at_a_time(formatter, array)
+
+@given(lists(floats()), lists(floats()), lists(floats()))
+def test_format_column_truncates_like_formatting_each_value(values, steps_less_than, steps_greater_than):
+    array = np.array(values, dtype=float)
+    for cls in [TruncatedFormatter, TruncatedPValueFormatter]:
+        formatter = cls(steps_less_than=steps_less_than, steps_greater_than=steps_greater_than)
+        assert formatter.format_column(array) == _runs_one_at_a_time(formatter, array)
+
+@given(lists(integers(min_value=-2**62, max_value=2**62)))
+def test_format_column_of_integers(values):
+    array = np.array(values, dtype=np.int64)
+    for formatter in [IntegerFormatter(), RoundedFormatter(2), TruncatedFormatter(steps_less_than=[0])]:
+        assert formatter.format_column(array) == _runs_one_at_a_time(formatter, array)
+
+def test_format_column_of_objects_falls_back_to_formatting_each_value():
+    values = np.array(["a", 1, 2.5], dtype=object)
+    assert DefaultFormatter().format_column(values) == [[("a", None)], [("1", None)], [("2.5", None)]]
+
+class _BracketFormatter(DocxFormatter):
+    # A formatter which only knows how to insert values into paragraphs
+
+    def insert(self, paragraph, value):
+        paragraph.add_run("[")
+        paragraph.add_run(str(value)).bold = True
+        paragraph.add_run("]")
+        return paragraph
+
+def test_as_plaintext_of_formatters_which_only_define_insert():
+    formatter = _BracketFormatter()
+    assert formatter.as_plaintext(1) == "[1]"
+    # The scratch paragraph doesn't keep the runs from previous values
+    assert formatter.as_plaintext(2) == "[2]"
+    assert formatter.runs(3) == [("[", None), ("3", 'bold'), ("]", None)]
+
+def test_as_plaintext_is_the_same_as_the_inserted_text():
+    document = Document()
+    formatter = TruncatedPValueFormatter()
+    for value in [0.00001, 0.02, 0.5, float('nan')]:
+        paragraph = formatter.insert(document.add_paragraph(), value)
+        assert formatter.as_plaintext(value) == paragraph.text
+
+def test_format_column_as_plaintext():
+    formatter = TruncatedFormatter(steps_less_than=[0.5], nr_of_places=1)
+    assert formatter.format_column_as_plaintext(np.array([0.1, 0.75])) == ["< 0.5", "0.8"]
+
+def test_formatter_cache():
+    DocxFormatter.enable_cache(maxsize=3)
+    try:
+        formatter = RoundedFormatter(2)
+        assert formatter.as_plaintext(1.0) == "1.00"
+        assert formatter.as_plaintext(1.0) == "1.00"
+        assert DocxFormatter.cache_info() == FormatterCacheInfo(hits=1, misses=1, maxsize=3, currsize=1)
+
+        # Formatters with a different configuration don't share results
+        assert RoundedFormatter(1).as_plaintext(1.0) == "1.0"
+        # Values which are equal but are formatted differently aren't mixed up
+        assert DefaultFormatter().as_plaintext(1) == "1"
+        assert DefaultFormatter().as_plaintext(1.0) == "1.0"
+        assert formatter.as_plaintext(-0.0) == "-0.00"
+        assert DocxFormatter.cache_info().currsize == 3
+
+        # NaNs are cached too, even if they aren't equal to each other
+        formatter.as_plaintext(float('nan'))
+        formatter.as_plaintext(float('nan'))
+        assert DocxFormatter.cache_info().hits == 2
+        # Insert also uses the cache
+        paragraph = Document().add_paragraph()
+        formatter.insert(paragraph, float('nan'))
+        assert paragraph.text == "NaN"
+        assert DocxFormatter.cache_info().hits == 3
+
+        # Changing the configuration of a formatter after it was used changes its results
+        formatter.nr_of_places = 1
+        assert formatter.as_plaintext(1.0) == "1.0"
+
+        # Values of other types may be equal but formatted differently, so they aren't cached
+        currsize = DocxFormatter.cache_info().currsize
+        for (value, other) in [(Decimal('1.0'), Decimal('1.00')),
+                               # The same instant in two time zones (pandas timestamps are datetimes too)
+                               (datetime.datetime(2020, 1, 1, 0, 0, tzinfo=datetime.timezone.utc),
+                                datetime.datetime(2020, 1, 1, 1, 0,
+                                                  tzinfo=datetime.timezone(datetime.timedelta(hours=1)))),
+                               ((1,), (1.0,))]:
+            assert value == other
+            assert DefaultFormatter().as_plaintext(value) == str(value)
+            assert DefaultFormatter().as_plaintext(other) == str(other)
+        assert DocxFormatter.cache_info().currsize == currsize
+    finally:
+        DocxFormatter.disable_cache()
+
+    assert DocxFormatter.cache_info() is None
@@ -0,0 +1,179 @@
+from playfair.docx import *
+
+from docx import Document
+
+import pytest
+pd = pytest.importorskip('pandas')
+import numpy as np
+import csv
+import itertools
+
+def _example_dataframe(nr_of_rows=50):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Group': ['group\t{}'.format(i) if i % 7 == 0 else ' group {} '.format(i)
+                  for i in range(nr_of_rows)],
+        'N': rng.integers(0, 1000, nr_of_rows).astype(float),
+        'Effect': np.concatenate([[np.inf, -np.inf, np.nan], rng.normal(size=nr_of_rows - 3)]),
+        'p': np.concatenate([[np.nan, 1e-7, 0.5], rng.uniform(size=nr_of_rows - 3) ** 4]),
+        'Fold': rng.uniform(0, 10, nr_of_rows)
+    })
+
+_example_formatters = {
+    'N': IntegerFormatter(),
+    'Effect': RoundedFormatter(2),
+    'p': TruncatedPValueFormatter(),
+    'Fold': TruncatedFormatter(steps_less_than=[0.5], steps_greater_than=[9.0], nr_of_places=1)
+}
+
+def _table_contents(table):
+    return [[[(run.text, run.bold, run.italic) for run in cell.paragraphs[0].runs]
+             for cell in row.cells]
+            for row in table.rows]
+
+def test_bulk_tables_are_the_same_as_normal_tables():
+    dataframe = _example_dataframe()
+    document = new_styled_document()
+    nr_of_tables = len(document.tables)
+    table = add_table_from_dataframe(document, dataframe, _example_formatters)
+    bulk_table = add_table_from_dataframe(document, dataframe, _example_formatters, bulk=True)
+
+    assert len(document.tables) == nr_of_tables + 2
+    assert _table_contents(bulk_table) == _table_contents(table)
+    assert bulk_table.cell(1, 0).width == table.cell(1, 0).width
+    assert [cell.text for cell in bulk_table.rows[0].cells] == list(dataframe.columns)
+    assert bulk_table.cell(2, 3).text == table.cell(2, 3).text == 'p < 0.000'
+
+def test_write_table_stream_from_dataframe_chunks(tmp_path):
+    dataframe = _example_dataframe()
+    document = new_styled_document()
+    table = add_table_from_dataframe(document, dataframe, _example_formatters, bulk=True)
+
+    path = str(tmp_path / 'streamed.docx')
+    chunks = (dataframe.iloc[start:start + 7] for start in range(0, len(dataframe), 7))
+    assert write_table_stream(path, chunks, formatters=_example_formatters) == len(dataframe)
+
+    streamed_table = Document(path).tables[-1]
+    assert _table_contents(streamed_table) == _table_contents(table)
+
+def test_write_table_stream_from_rows(tmp_path):
+    def rows():
+        for i in range(3):
+            yield [(i, 0.001 * i), (i + 10, 0.5)]
+
+    path = str(tmp_path / 'streamed.docx')
+    nr_of_rows = write_table_stream(path, rows(), columns=['N', 'p'],
+                                    formatters={'p': TruncatedPValueFormatter()})
+    assert nr_of_rows == 6
+
+    streamed_table = Document(path).tables[-1]
+    assert [[cell.text for cell in row.cells] for row in streamed_table.rows] == [
+        ['N', 'p'],
+        ['0', 'p < 0.000'],
+        ['10', 'p = 0.500'],
+        ['1', 'p < 0.010'],
+        ['11', 'p = 0.500'],
+        ['2', 'p < 0.010'],
+        ['12', 'p = 0.500']
+    ]
+
+def test_write_table_stream_from_rows_of_mixed_types(tmp_path):
+    path = str(tmp_path / 'streamed.docx')
+    write_table_stream(path, [[(1, 'x', True), (2.5, 'y', 2)]], columns=['a', 'b', 'c'])
+
+    streamed_table = Document(path).tables[-1]
+    assert [[cell.text for cell in row.cells] for row in streamed_table.rows] == [
+        ['a', 'b', 'c'],
+        ['1', 'x', 'True'],
+        ['2.5', 'y', '2']
+    ]
+
+def test_write_table_stream_from_a_csv_reader(tmp_path):
+    lines = ["N,p,name", "0,0.0,a", "10,0.5,b", "1,0.001,c", "11,0.5,d"]
+    reader = csv.reader(lines)
+    columns = next(reader)
+    chunks = iter(lambda: list(itertools.islice(reader, 3)), [])
+
+    path = str(tmp_path / 'streamed.docx')
+    nr_of_rows = write_table_stream(path, chunks, columns,
+                                    formatters={'N': IntegerFormatter(), 'p': TruncatedPValueFormatter()},
+                                    converters={'N': int, 'p': float})
+    assert nr_of_rows == 4
+
+    streamed_table = Document(path).tables[-1]
+    assert [[cell.text for cell in row.cells] for row in streamed_table.rows] == [
+        ['N', 'p', 'name'],
+        ['0', 'p < 0.000', 'a'],
+        ['10', 'p = 0.500', 'b'],
+        ['1', 'p < 0.010', 'c'],
+        ['11', 'p = 0.500', 'd']
+    ]
+
+def test_tables_with_index_and_caption():
+    dataframe = pd.DataFrame({'x': [1.5, 2.5], 'label': ['a', 'b']},
+                             index=pd.Index([10, 20], name='id'))
+    for bulk in [False, True]:
+        document = Document()
+        table = add_table_from_dataframe(document, dataframe, {'id': IntegerFormatter()},
+                                         strip_index=False, caption="Table 1: Results", bulk=bulk)
+        assert document.paragraphs[-1].text == "Table 1: Results"
+        assert document.paragraphs[-1].style.name == 'Caption'
+        assert [[cell.text for cell in row.cells] for row in table.rows] == [
+            ['id', 'x', 'label'],
+            ['10', '1.5', 'a'],
+            ['20', '2.5', 'b']
+        ]
+
+def test_tables_from_dataframes_without_a_default_index():
+    dataframe = pd.DataFrame({'x': [1, 2, 3]}, index=[5, 3, 1])
+    table = add_table_from_dataframe(Document(), dataframe)
+    assert [row.cells[0].text for row in table.rows] == ['x', '1', '2', '3']
+
+def test_default_formatter_column_of_mixed_dtypes():
+    for values in [np.array([1, 2]), np.array([0.1, 1e300]), np.array([0.1], dtype=np.float32),
+                   np.array([True]), np.array(['a', 'b']), np.array(['2021-01-01'], dtype='datetime64[D]'),
+                   [1, 2.5], (True, 2)]:
+        formatter = DefaultFormatter()
+        assert formatter.format_column(values) == [formatter.runs(value) for value in values]
+
+def test_dates_are_written_as_in_pandas(tmp_path):
+    dataframe = pd.DataFrame({'date': pd.to_datetime(['2020-01-01 00:00', '2020-01-02 12:30', None]),
+                              'duration': pd.to_timedelta(['1 day', '2 hours', None])},
+                             index=pd.to_datetime(['2021-03-01', '2021-03-02', '2021-03-03']))
+    expected = [
+        ['', 'date', 'duration'],
+        ['2021-03-01 00:00:00', '2020-01-01 00:00:00', '1 days 00:00:00'],
+        ['2021-03-02 00:00:00', '2020-01-02 12:30:00', '0 days 02:00:00'],
+        ['2021-03-03 00:00:00', 'NaT', 'NaT']
+    ]
+    for bulk in [False, True]:
+        table = add_table_from_dataframe(new_styled_document(), dataframe, strip_index=False, bulk=bulk)
+        assert [[cell.text for cell in row.cells] for row in table.rows] == expected
+
+    path = str(tmp_path / 'streamed.docx')
+    write_table_stream(path, [dataframe.iloc[:2], dataframe.iloc[2:]])
+    streamed_table = Document(path).tables[-1]
+    # Streamed tables have no index
+    assert [[cell.text for cell in row.cells] for row in streamed_table.rows] == [row[1:] for row in expected]
+
+def test_add_tables_in_parallel():
+    dataframe = _example_dataframe()
+    specs = [
+        TableSpec(dataframe, _example_formatters, caption="Table 1"),
+        TableSpec(dataframe.iloc[:5], strip_index=False),
+        TableSpec(dataframe.iloc[:3], _example_formatters, caption="Table 3")
+    ]
+
+    document = Document()
+    results = add_tables_in_parallel(document, specs, processes=2)
+
+    expected_document = Document()
+    expected_tables = [add_table_from_dataframe(expected_document, spec.dataframe, spec.formatters,
+                                                strip_index=spec.strip_index, caption=spec.caption)
+                       for spec in specs]
+
+    assert [paragraph.text for paragraph in document.paragraphs] == ["Table 1", "Table 3"]
+    assert len(document.tables) == 3
+    for ((table, seconds), expected_table) in zip(results, expected_tables):
+        assert seconds > 0
+        assert _table_contents(table) == _table_contents(expected_table)
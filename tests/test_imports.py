@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+def _import_in_subprocess(module):
+    # Import the module in a fresh interpreter and report which
+    # heavy dependencies were imported with it
+    code = (
+        "import sys\n"
+        "import {}\n"
+        "print(' '.join(sorted(m for m in ['matplotlib', 'docx', 'numpy'] if m in sys.modules)))\n"
+    ).format(module)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.check_output([sys.executable, '-c', code], env=env, text=True)
+    return output.split()
+
+def test_import_playfair_is_lazy():
+    modules = _import_in_subprocess('playfair')
+    assert modules == []
+
+def test_import_playfair_docx_doesnt_import_matplotlib_or_python_docx():
+    modules = _import_in_subprocess('playfair.docx')
+    assert 'matplotlib' not in modules
+    assert 'docx' not in modules
+
+def test_submodules_are_available_as_attributes():
+    import playfair
+    assert playfair.layout.LayerStack is not None
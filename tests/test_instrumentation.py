@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+
+from docx import Document
+import pytest
+
+from playfair import instrumentation
+from playfair.instrumentation import instrument
+from playfair.compare import add_comparisons_to_axes
+from playfair.docx import add_table_from_dataframe, TruncatedPValueFormatter, register_template, \
+    new_document_from_template
+from matplotlib import pyplot as plt
+
+from tests.test_compare import _example_comparisons
+
+def test_instrumentation_is_off_by_default():
+    assert instrumentation.active() is None
+    with instrumentation.timer('nothing'):
+        instrumentation.count('nothing')
+    assert instrumentation.active() is None
+
+def test_instrument_compare():
+    (data, comps) = _example_comparisons()
+    fig, ax = plt.subplots(1)
+    ax.boxplot(data)
+    with instrument() as recorder:
+        (_heights, nr_of_layers) = add_comparisons_to_axes(ax, comps, batched=True)
+    plt.close(fig)
+
+    summary = recorder.summary()
+    assert summary['counters']['compare.layout_calls'] == 1
+    assert summary['counters']['compare.comparisons'] == len(comps)
+    assert summary['counters']['compare.artists'] == 1 + len(comps)
+    assert summary['maxima']['compare.max_layers'] == max(nr_of_layers.values())
+    assert summary['timings']['compare.layout']['calls'] == 1
+    assert instrumentation.active() is None
+
+@pytest.mark.parametrize('bulk', [False, True])
+def test_instrument_docx_tables(bulk):
+    pd = pytest.importorskip('pandas')
+    dataframe = pd.DataFrame({'x': [1.0, 2.0, 3.0], 'p': [0.5, 0.001, 0.00001]})
+    with instrument() as recorder:
+        add_table_from_dataframe(Document(), dataframe, {'p': TruncatedPValueFormatter()}, bulk=bulk)
+
+    summary = recorder.summary()
+    assert summary['counters']['docx.cells'] == 8
+    # One run for each header and value, except for the p-values, which have three
+    assert summary['counters']['docx.runs'] == 5 + 3 * 3
+    assert summary['timings']['docx.format_column.x']['calls'] == 1
+    assert summary['timings']['docx.format_column.p']['calls'] == 1
+
+def test_instrument_template_load(tmp_path):
+    path = str(tmp_path / 'template.docx')
+    Document().save(path)
+    register_template('instrumented', path)
+    with instrument() as recorder:
+        new_document_from_template('instrumented')
+        new_document_from_template('instrumented')
+    # The template is loaded only once
+    assert recorder.summary()['timings']['docx.template_load']['calls'] == 1
+
+def test_hooks_receive_the_summary():
+    summaries = []
+    instrumentation.add_hook(summaries.append)
+    try:
+        with instrument():
+            instrumentation.count('things', 3)
+    finally:
+        instrumentation.remove_hook(summaries.append)
+
+    assert summaries == [{'counters': {'things': 3}, 'timings': {}, 'maxima': {}}]
+
+def test_environment_variable_reports_at_exit():
+    code = (
+        "from playfair import instrumentation\n"
+        "instrumentation.count('things', 2)\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    env[instrumentation.ENV_VAR] = '1'
+    result = subprocess.run([sys.executable, '-c', code], env=env,
+                            stderr=subprocess.PIPE, text=True, check=True)
+    assert json.loads(result.stderr)['counters'] == {'things': 2}
@@ -0,0 +1,219 @@
+from playfair.layout import LayerStack, comparison_layout, LayoutCache, LayoutCacheInfo, \
+    packing_order, comparison_layouts
+
+import os
+import numpy as np
+
+from hypothesis import given
+from hypothesis.strategies import floats, integers, lists, tuples
+
+_MIN = -1e20
+
+def _sorted_pair(pair):
+    return tuple(sorted(pair))
+
+positions = integers(min_value=0, max_value=20)
+markers = lists(tuples(tuples(positions, positions).map(_sorted_pair),
+                       floats(min_value=-100, max_value=100)),
+                max_size=40)
+
+@given(markers)
+def test_layer_stack_stacks_like_dicts_of_integer_positions(markers):
+    # This is how the markers used to be stacked
+    heights = dict()
+    nr_of_layers = dict()
+
+    stack = LayerStack([pos for ((pos1, pos2), _height) in markers for pos in (pos1, pos2)])
+    for ((pos1, pos2), height) in markers:
+        envelopped = range(pos1, pos2 + 1)
+        assert stack.height(pos1) == heights.get(pos1, _MIN)
+        assert stack.height(pos2) == heights.get(pos2, _MIN)
+        assert stack.nr_of_layers(pos1) == nr_of_layers.get(pos1, 0)
+        assert stack.nr_of_layers(pos2) == nr_of_layers.get(pos2, 0)
+        max_height = max(heights.get(pos, _MIN) for pos in envelopped)
+        assert stack.max_height(pos1, pos2) == max_height
+        max_nr_of_layers = max(nr_of_layers.get(pos, 0) for pos in envelopped)
+        assert stack.max_nr_of_layers(pos1, pos2) == max_nr_of_layers
+
+        # Markers are always stacked on top of the ones they envelop
+        new_height = max(height, max_height)
+        stack.push(pos1, pos2, new_height)
+        for pos in envelopped:
+            heights[pos] = new_height
+            nr_of_layers[pos] = max_nr_of_layers + 1
+
+    (stack_heights, stack_nr_of_layers) = stack.as_dicts()
+    for pos in stack.positions:
+        assert stack_heights[pos] == heights[pos]
+        assert stack_nr_of_layers[pos] == nr_of_layers[pos]
+
+@given(lists(tuples(positions, positions, floats(-100, 100), floats(-100, 100)), max_size=40))
+def test_layer_stack_place_is_the_same_as_push(markers):
+    stack = LayerStack([pos for (pos1, pos2, _top1, _top2) in markers for pos in (pos1, pos2)])
+    expected_stack = LayerStack(stack.positions)
+    for (pos1, pos2, top1, top2) in markers:
+        expected = (expected_stack.height(pos1), expected_stack.height(pos2),
+                    expected_stack.max_height(pos1, pos2),
+                    expected_stack.nr_of_layers(pos1), expected_stack.nr_of_layers(pos2),
+                    expected_stack.max_nr_of_layers(pos1, pos2))
+        expected_stack.push(pos1, pos2, max(top1, top2, *expected[:3]))
+        assert stack.place(pos1, pos2, top1, top2) == expected
+
+    assert stack.as_dicts() == expected_stack.as_dicts()
+
+@given(lists(tuples(positions, positions), max_size=40))
+def test_layer_stack_tracks_the_markers_below_each_marker(markers):
+    stack = LayerStack([pos for marker in markers for pos in marker], track_markers=True)
+    # The top marker over each position
+    top = dict((pos, -1) for pos in stack.positions)
+    for (i, (pos1, pos2)) in enumerate(markers):
+        stack.place(pos1, pos2, 0.0, 0.0)
+        between = [pos for pos in stack.positions if min(pos1, pos2) <= pos <= max(pos1, pos2)]
+        (marker1, marker2, below) = stack.supports[i]
+        assert (marker1, marker2) == (top[pos1], top[pos2])
+        assert set(below) == set(top[pos] for pos in between)
+        for pos in between:
+            top[pos] = i
+
+    assert stack.top_markers() == dict((pos, marker) for (pos, marker) in top.items() if marker >= 0)
+
+def test_layer_stack_accepts_non_integer_positions():
+    stack = LayerStack([0.8, 1.2, 1.8, 2.2])
+    stack.push(0.8, 1.2, 3.0)
+    stack.push(1.8, 2.2, 2.0)
+    assert stack.max_nr_of_layers(0.8, 2.2) == 1
+    stack.push(0.8, 2.2, 4.0)
+    assert stack.nr_of_layers(1.2) == 2
+    assert stack.max_height(1.2, 1.8) == 4.0
+
+def test_comparison_layout_of_two_stacked_markers():
+    layout = comparison_layout([1, 1], [2, 3], [2.0, 2.0], [1.0, 5.0], font_size=10.0)
+    pt = 1.0/72
+    # The second marker is above the first one and the third group
+    assert layout.max_all.tolist() == [2.0, 5.0]
+    assert layout.max_left.tolist() == [2.0, 2.0]
+    assert layout.max_right.tolist() == [1.0, 5.0]
+    assert np.allclose(layout.offset_left, [14 * pt, 14 * pt + 32 * pt])
+    assert np.allclose(layout.offset_right, [14 * pt, 14 * pt])
+    assert np.allclose(layout.offset_middle, [26 * pt, 58 * pt])
+    assert np.allclose(layout.offset_text, [32 * pt, 64 * pt])
+    assert layout.text_anchors.tolist() == [[1.5, 2.0], [2.0, 5.0]]
+    assert layout.stack.as_dicts() == ({1: 5.0, 2: 5.0, 3: 5.0}, {1: 2, 2: 2, 3: 2})
+
+@given(markers)
+def test_comparison_layout_segments_are_connected(markers):
+    pos1 = [pos1 for ((pos1, _pos2), _top) in markers]
+    pos2 = [pos2 for ((_pos1, pos2), _top) in markers]
+    tops = [top for (_positions, top) in markers]
+    layout = comparison_layout(pos1, pos2, tops, tops)
+
+    assert layout.segments.shape == (len(markers), 5, 2, 2)
+    assert layout.offsets.shape == (len(markers), 5, 2)
+    assert len(layout) == len(markers)
+    # The segments are joined (s1 -> s2 -> s3 and s5 -> s4 -> s3)
+    for (a, b) in [((0, 1), (1, 0)), ((1, 1), (2, 0)), ((4, 1), (3, 0)), ((3, 1), (2, 1))]:
+        assert (layout.segments[:, a[0], a[1]] == layout.segments[:, b[0], b[1]]).all()
+        assert (layout.offsets[:, a[0], a[1]] == layout.offsets[:, b[0], b[1]]).all()
+    # Markers are above their groups and their label is above the horizontal segment
+    assert (layout.max_all >= np.asarray(tops).reshape(-1)).all()
+    assert (layout.offset_text > layout.offset_middle).all()
+
+def test_comparison_layout_doesnt_need_matplotlib():
+    import subprocess
+    import sys
+    import os
+    code = (
+        "import sys\n"
+        "from playfair.layout import comparison_layout\n"
+        "comparison_layout([1], [2], [1.0], [2.0])\n"
+        "assert 'matplotlib' not in sys.modules\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    subprocess.check_call([sys.executable, '-c', code], env=env)
+
+def _cached_example(cache, top=2.0):
+    return cache.layout([1, 1, 2], [2, 3, 3], [top, top, 1.0], [1.0, 5.0, 5.0], font_size=10.0)
+
+def test_layout_cache_returns_the_same_layout():
+    cache = LayoutCache(maxsize=2)
+    layout = _cached_example(cache)
+    assert _cached_example(cache) is layout
+    assert cache.info() == LayoutCacheInfo(1, 1, 2, 1)
+
+    expected = comparison_layout([1, 1, 2], [2, 3, 3], [2.0, 2.0, 1.0], [1.0, 5.0, 5.0], font_size=10.0)
+    assert (layout.segments == expected.segments).all()
+    assert (layout.offsets == expected.offsets).all()
+
+    # Different tops or font sizes give different layouts
+    assert _cached_example(cache, top=3.0) is not layout
+    assert cache.layout([1], [2], [1.0], [1.0], font_size=12.0) is not \
+        cache.layout([1], [2], [1.0], [1.0], font_size=10.0)
+    assert cache.info().currsize == 2
+
+def test_layout_cache_on_disk(tmp_path):
+    directory = str(tmp_path / 'layouts')
+    layout = _cached_example(LayoutCache(directory=directory))
+
+    # Another cache (maybe in another process) finds the layout on disk
+    cache = LayoutCache(directory=directory)
+    cached_layout = _cached_example(cache)
+    assert cache.info().hits == 1
+    assert (cached_layout.segments == layout.segments).all()
+    assert cached_layout.stack.as_dicts() == layout.stack.as_dicts()
+
+    cache.clear()
+    assert os.listdir(directory) == []
+
+def test_layout_cache_on_disk_is_bounded(tmp_path):
+    directory = str(tmp_path / 'layouts')
+    cache = LayoutCache(directory=directory)
+    _cached_example(cache, top=1.0)
+    [filename] = os.listdir(directory)
+    size = os.path.getsize(os.path.join(directory, filename))
+
+    # There is only room for one of the layouts
+    cache = LayoutCache(directory=directory, max_bytes=size + size // 2)
+    _cached_example(cache, top=2.0)
+    assert len(os.listdir(directory)) == 1
+    assert os.listdir(directory) != [filename]
+
+@given(markers)
+def test_packing_order_uses_the_minimum_number_of_layers(markers):
+    pos1 = [pos1 for ((pos1, _pos2), _top) in markers]
+    pos2 = [pos2 for ((_pos1, pos2), _top) in markers]
+    order = packing_order(pos1, pos2)
+    assert sorted(order) == list(range(len(markers)))
+
+    stack = LayerStack(pos1 + pos2)
+    for i in order:
+        stack.push(pos1[i], pos2[i], 0.0)
+    (_heights, nr_of_layers) = stack.as_dicts()
+
+    # The markers which overlap at a position must be in different layers
+    overlapping = [sum(1 for (p1, p2) in zip(pos1, pos2) if p1 <= pos <= p2)
+                   for pos in stack.positions]
+    assert max(nr_of_layers.values(), default=0) == max(overlapping, default=0)
+
+def test_packing_order_of_a_chain_of_comparisons():
+    # In this order, each comparison would be stacked on top of the previous one
+    pos1 = [1, 2, 3, 4]
+    pos2 = [2, 3, 4, 5]
+    order = packing_order(pos1, pos2)
+    assert order == [0, 2, 1, 3]
+
+@given(markers, integers(min_value=1, max_value=4))
+def test_comparison_layouts_are_the_same_as_one_layout_per_panel(markers, nr_of_panels):
+    pos1 = [pos1 for ((pos1, _pos2), _top) in markers]
+    pos2 = [pos2 for ((_pos1, pos2), _top) in markers]
+    tops = np.array([top for (_positions, top) in markers])
+    top1 = np.array([tops + panel for panel in range(nr_of_panels)]).reshape(nr_of_panels, -1)
+    top2 = np.array([tops[::-1] * panel for panel in range(nr_of_panels)]).reshape(nr_of_panels, -1)
+
+    layouts = comparison_layouts(pos1, pos2, top1, top2, font_size=12.0)
+    assert len(layouts) == nr_of_panels
+    for (panel, layout) in enumerate(layouts):
+        expected = comparison_layout(pos1, pos2, top1[panel], top2[panel], font_size=12.0)
+        assert (layout.segments == expected.segments).all()
+        assert (layout.offsets == expected.offsets).all()
+        assert (layout.text_anchors == expected.text_anchors).all()
+        assert layout.as_dicts() == expected.as_dicts()
@@ -0,0 +1,96 @@
+import pytest
+stats = pytest.importorskip('scipy.stats')
+
+import numpy as np
+
+from playfair.stats import welch_tests, mann_whitney_tests, adjust_p_values, pairwise_tests, \
+    significant_comparisons, stars_label, p_value_label
+from playfair.compare import stars
+
+def _example_groups():
+    rng = np.random.default_rng(0)
+    groups = [rng.normal(loc=i / 4, size=20 + 3 * i) for i in range(6)]
+    # Ties, within and between groups
+    groups.append(np.round(rng.normal(size=30)))
+    groups.append(np.round(rng.normal(loc=0.5, size=25)))
+    groups[0][:3] = np.nan
+    return groups
+
+def _without_nans(group):
+    return group[~np.isnan(group)]
+
+def test_welch_tests_are_the_same_as_scipy():
+    groups = _example_groups()
+    (index1, index2, t, p_values) = welch_tests(groups)
+    assert len(index1) == len(groups) * (len(groups) - 1) // 2
+    for (i, j, t_ij, p_ij) in zip(index1, index2, t, p_values):
+        expected = stats.ttest_ind(_without_nans(groups[i]), _without_nans(groups[j]), equal_var=False)
+        assert t_ij == pytest.approx(expected.statistic)
+        assert p_ij == pytest.approx(expected.pvalue)
+
+@pytest.mark.parametrize('block_size', [3, 4096])
+def test_mann_whitney_tests_are_the_same_as_scipy(block_size):
+    groups = _example_groups()
+    (index1, index2, u, p_values) = mann_whitney_tests(groups, block_size=block_size)
+    for (i, j, u_ij, p_ij) in zip(index1, index2, u, p_values):
+        expected = stats.mannwhitneyu(_without_nans(groups[i]), _without_nans(groups[j]),
+                                      method='asymptotic')
+        assert u_ij == pytest.approx(expected.statistic)
+        assert p_ij == pytest.approx(expected.pvalue)
+
+def test_mann_whitney_tests_in_a_process_pool():
+    groups = _example_groups()
+    expected = mann_whitney_tests(groups)
+    result = mann_whitney_tests(groups, processes=2, block_size=10)
+    for (array, expected_array) in zip(result, expected):
+        assert np.allclose(array, expected_array)
+
+def test_adjust_p_values():
+    p_values = np.array([0.01, 0.04, 0.03, 0.005])
+    assert np.allclose(adjust_p_values(p_values, 'bonferroni'), [0.04, 0.16, 0.12, 0.02])
+    assert np.allclose(adjust_p_values(p_values, 'holm'), [0.03, 0.06, 0.06, 0.02])
+    assert np.allclose(adjust_p_values(p_values, 'bh'), [0.02, 0.04, 0.04, 0.02])
+    assert np.allclose(adjust_p_values(p_values, None), p_values)
+    with pytest.raises(ValueError):
+        adjust_p_values(p_values, 'unknown')
+
+def test_adjust_p_values_leaves_nans_alone():
+    p_values = np.array([0.01, np.nan, 0.02, 0.04])
+    expected = {'bonferroni': [0.03, np.nan, 0.06, 0.12],
+                'holm': [0.03, np.nan, 0.04, 0.04],
+                'bh': [0.03, np.nan, 0.03, 0.04],
+                None: p_values}
+    for (method, expected_p_values) in expected.items():
+        assert np.allclose(adjust_p_values(p_values, method), expected_p_values, equal_nan=True)
+    assert np.isnan(adjust_p_values([np.nan], 'bh')).all()
+
+def test_significant_comparisons_with_a_group_of_one():
+    rng = np.random.default_rng(0)
+    groups = [rng.normal(size=50), rng.normal(loc=5, size=50), [1.0]]
+    for correction in ['bonferroni', 'holm', 'bh']:
+        comparisons = significant_comparisons(groups, test='welch', correction=correction)
+        # The group with a single value can't be compared with Welch's test
+        assert [(comparison.pos1, comparison.pos2) for comparison in comparisons] == [(1, 2)]
+
+def test_labels():
+    assert stars_label(0.2) == stars(0)
+    assert stars_label(0.004) == stars(2)
+    assert p_value_label(0.004) == '$p < 0.01$'
+    assert p_value_label(0.2) == '$p = 0.20$'
+
+def test_significant_comparisons():
+    groups = _example_groups()
+    positions = [10 * (i + 1) for i in range(len(groups))]
+    results = pairwise_tests(groups, test='mann-whitney', correction='bh')
+    comparisons = significant_comparisons(groups, positions, test='mann-whitney', correction='bh',
+                                          alpha=0.05, label=p_value_label)
+
+    significant = results.adjusted_p_values < 0.05
+    assert 0 < len(comparisons) == significant.sum()
+    for (comparison, i, j, p_value) in zip(comparisons, results.index1[significant],
+                                           results.index2[significant],
+                                           results.adjusted_p_values[significant]):
+        assert (comparison.pos1, comparison.pos2) == (positions[i], positions[j])
+        assert comparison.data1 == np.nanmax(groups[i])
+        assert comparison.data2 == np.nanmax(groups[j])
+        assert comparison.text == p_value_label(p_value)